@@ -3,23 +3,29 @@ PyQuest - Python Learning Platform
 Main web application server
 """
 
-from flask import Flask, render_template, request, jsonify, session
+from flask import Flask, render_template, request, jsonify, session, Response
 from flask_cors import CORS
 from dotenv import load_dotenv
 import os
+import queue
 from datetime import datetime, timedelta
 import json
 from pathlib import Path
-import markdown
 
 # Load environment variables
 load_dotenv()
 
 # Import our modules
 from challenges.loader import ChallengeLoader
+from challenges.rendering import MarkdownCache, render_fields
+from challenges.sampler import RECENT_LIMIT
 from grader.test_runner import TestRunner
+from grader.cache import ResultCache
+from grader.jobs import GradingQueue, QueueFullError
+from grader.diagnostics import render as render_diagnostic
 from reminders.scheduler import ReminderScheduler
 from progress.tracker import ProgressTracker
+from progress.cursor import CompletionCursor
 from practice.generator import ChallengeGenerator
 
 # Initialize Flask app
@@ -27,21 +33,73 @@ app = Flask(__name__)
 app.secret_key = os.getenv('SECRET_KEY', 'dev-secret-key-change-in-production')
 CORS(app)
 
-# Initialize Markdown converter
-md = markdown.Markdown(extensions=['fenced_code', 'tables', 'nl2br'])
+# Rendered challenge text, cached by content hash (and on disk unless disabled)
+markdown_cache = MarkdownCache(
+    max_bytes=int(float(os.getenv('MARKDOWN_CACHE_MB', 16)) * 1024 * 1024),
+    cache_dir=os.getenv('MARKDOWN_CACHE_DIR', str(Path(__file__).parent / 'challenges' / 'data' / '.markdown')),
+    max_disk_bytes=int(float(os.getenv('MARKDOWN_CACHE_DISK_MB', 64)) * 1024 * 1024)
+)
 
 # Add custom filter for markdown
 @app.template_filter('markdown')
 def markdown_filter(text):
     """Convert markdown to HTML"""
-    if text:
-        return markdown.markdown(text, extensions=['fenced_code', 'tables', 'nl2br'])
-    return ''
+    return markdown_cache.render(text)
 
 # Initialize components
-challenge_loader = ChallengeLoader()
-test_runner = TestRunner()
+challenge_loader = ChallengeLoader(
+    # Pick up edited week files without a restart (0 = off)
+    reload_interval=float(os.getenv('CURRICULUM_RELOAD_INTERVAL', 2)) or None,
+    # Memory-mapped curriculum instead of the week files (python -m challenges.bundle build)
+    bundle_path=os.getenv('CURRICULUM_BUNDLE') or None
+)
+test_runner = TestRunner(
+    sandbox=os.getenv('GRADER_SANDBOX', 'true').lower() == 'true',
+    workers=int(os.getenv('GRADER_WORKERS') or 0) or None,
+    timeout=float(os.getenv('GRADER_TIMEOUT', 5)),
+    max_output_bytes=int(float(os.getenv('GRADER_MAX_OUTPUT_KB', 64)) * 1024),
+    measure_memory=os.getenv('GRADER_MEASURE_MEMORY', 'false').lower() == 'true',
+    cache=ResultCache(
+        max_bytes=int(float(os.getenv('GRADER_CACHE_MB', 32)) * 1024 * 1024),
+        ttl=float(os.getenv('GRADER_CACHE_TTL', 3600))
+    )
+)
+grading_queue = GradingQueue(
+    test_runner,
+    max_size=int(os.getenv('GRADER_QUEUE_SIZE', 64))
+)
+
+
+def _precompile_tests(loader):
+    """Compile the expected values of every challenge into comparison plans"""
+    if loader.lazy:
+        return  # Compiled on first use instead of decoding the whole bundle
+    for challenge in loader.get_all_challenges():
+        test_runner.precompile(challenge.get('tests', []))
+
+
+def _prerender_markdown(loader):
+    """Render the lessons of every challenge so no page view has to"""
+    if loader.lazy:
+        return  # Rendered (or read from the disk cache) on first view instead
+    markdown_cache.warm(loader.get_all_challenges())
+
+
+# Now rather than on each request, and again whenever the curriculum reloads
+_precompile_tests(challenge_loader)
+_prerender_markdown(challenge_loader)
+challenge_loader.add_reload_listener(_precompile_tests)
+challenge_loader.add_reload_listener(_prerender_markdown)
+
 progress_tracker = ProgressTracker()
+
+# Today's challenge follows the tracker's start date (no file reads per request)
+challenge_loader.set_progress_source(progress_tracker)
+
+# Next uncompleted challenge, moved along as completions are recorded
+completion_cursor = CompletionCursor(progress_tracker.get_completed_ids())
+progress_tracker.add_completion_listener(completion_cursor.mark_completed)
+
 reminder_scheduler = ReminderScheduler()
 challenge_generator = ChallengeGenerator()
 
@@ -49,14 +107,19 @@ challenge_generator = ChallengeGenerator()
 reminder_scheduler.start()
 
 
+@app.before_request
+def reload_challenges():
+    """Reload edited week files (throttled, a stat per file at most every few seconds)"""
+    challenge_loader.reload_if_changed()
+
+
 @app.route('/')
 def index():
     """Homepage - Dashboard with progress overview"""
     stats = progress_tracker.get_stats()
     
     # Get next uncompleted challenge (progress-based, not calendar-based)
-    completed_ids = progress_tracker.get_completed_ids()
-    next_challenge = challenge_loader.get_next_uncompleted_challenge(completed_ids)
+    next_challenge = challenge_loader.get_next_uncompleted_challenge(completion_cursor)
     
     # Fallback to today's challenge if all completed
     if not next_challenge:
@@ -70,6 +133,8 @@ def index():
             preview = desc.split('##')[0].strip()
         else:
             preview = desc
+        # Copy, loader challenges are read-only
+        next_challenge = dict(next_challenge)
         next_challenge['preview'] = preview[:200] + '...' if len(preview) > 200 else preview
     
     return render_template('index.html', 
@@ -93,8 +158,7 @@ def challenge():
         challenge_data = challenge_loader.get_challenge_by_day(day_offset)
     else:
         # No parameters - show next uncompleted challenge
-        completed_ids = progress_tracker.get_completed_ids()
-        challenge_data = challenge_loader.get_next_uncompleted_challenge(completed_ids)
+        challenge_data = challenge_loader.get_next_uncompleted_challenge(completion_cursor)
         
         # Fallback to today's challenge if all completed
         if not challenge_data:
@@ -104,34 +168,17 @@ def challenge():
         return render_template('error.html', 
                              message="No challenge available for this day")
     
-    # Get previous and next challenge info
-    current_week = challenge_data.get('week')
-    current_day = challenge_data.get('day')
-    
-    # Calculate previous
-    prev_week, prev_day = current_week, current_day - 1
-    if prev_day < 1:
-        prev_week -= 1
-        prev_day = 7
-    
-    # Calculate next
-    next_week, next_day = current_week, current_day + 1
-    if next_day > 7:
-        next_week += 1
-        next_day = 1
-    
-    # Check if prev/next exist
-    has_prev = challenge_loader.get_challenge(prev_week, prev_day) is not None
-    has_next = challenge_loader.get_challenge(next_week, next_day) is not None
+    # Get previous and next challenge info (precomputed by the loader)
+    prev_challenge, next_challenge = challenge_loader.get_neighbors(challenge_data['id'])
     
     return render_template('challenge.html', 
                          challenge=challenge_data,
-                         has_prev=has_prev,
-                         has_next=has_next,
-                         prev_week=prev_week,
-                         prev_day=prev_day,
-                         next_week=next_week,
-                         next_day=next_day)
+                         has_prev=prev_challenge is not None,
+                         has_next=next_challenge is not None,
+                         prev_week=prev_challenge['week'] if prev_challenge else None,
+                         prev_day=prev_challenge['day'] if prev_challenge else None,
+                         next_week=next_challenge['week'] if next_challenge else None,
+                         next_day=next_challenge['day'] if next_challenge else None)
 
 
 @app.route('/challenge/<int:week>/<int:day>')
@@ -146,26 +193,31 @@ def specific_challenge(week, day):
     return render_template('challenge.html', challenge=challenge_data)
 
 
-@app.route('/api/submit', methods=['POST'])
-def submit_solution():
-    """Submit and grade a solution"""
-    data = request.json
+def _resolve_submission(data):
+    """
+    Find the tests for a submission
     
-    challenge_id = data.get('challenge_id')
-    code = data.get('code', '')
+    Returns (tests, cache label, grading mode), with tests None if the
+    challenge doesn't exist. The mode comes from the request, then the
+    challenge's `grading_mode`, then defaults to sequential.
+    """
+    mode = data.get('mode')
     
     # For practice challenges, tests may be provided in request
     tests = data.get('tests')
+    if tests:
+        return tests, 'practice', mode or 'sequential'
     
-    if not tests:
-        # Get challenge details from curriculum
-        challenge = challenge_loader.get_challenge_by_id(challenge_id)
-        if not challenge:
-            return jsonify({'error': 'Challenge not found'}), 404
-        tests = challenge['tests']
-    
-    # Run tests
-    result = test_runner.run_tests(code, tests)
+    # Get challenge details from curriculum
+    challenge = challenge_loader.get_challenge_by_id(data.get('challenge_id'))
+    if not challenge:
+        return None, None, None
+    return challenge['tests'], challenge['id'], mode or challenge.get('grading_mode', 'sequential')
+
+
+def _record_progress(data, result):
+    """Record a passing curriculum submission"""
+    challenge_id = data.get('challenge_id')
     
     # Only record progress for curriculum challenges (not practice)
     if result['passed'] and challenge_id != 'practice_generated':
@@ -173,13 +225,173 @@ def submit_solution():
         if challenge:  # Only if it's a curriculum challenge
             progress_tracker.record_completion(
                 challenge_id=challenge_id,
-                code=code,
+                code=data.get('code', ''),
                 time_spent=data.get('time_spent', 0)
             )
+
+
+def _queue_full_response(error: QueueFullError):
+    """429 telling the client when to retry"""
+    response = jsonify({
+        'error': 'Grading queue is full',
+        'message': f'Too many submissions right now, try again in {error.retry_after}s'
+    })
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response, 429
+
+
+@app.route('/api/submit', methods=['POST'])
+def submit_solution():
+    """Submit and grade a solution"""
+    data = request.json
+    code = data.get('code', '')
+    
+    tests, cache_label, mode = _resolve_submission(data)
+    if not tests:
+        return jsonify({'error': 'Challenge not found'}), 404
+    if mode not in TestRunner.MODES:
+        return jsonify({'error': f"Unknown grading mode: {mode}"}), 400
+    
+    run_options = {
+        'challenge_id': cache_label,
+        'mode': mode,
+        # Output of passing tests is only sent back when the client asks for it
+        'include_output': bool(data.get('include_output', False)),
+        # Full error messages too (otherwise fetch them from /api/explain)
+        'explain': bool(data.get('explain', False))
+    }
+    
+    # Async mode: queue the job and let the client poll for the result
+    if data.get('async'):
+        try:
+            job_id = grading_queue.submit(
+                code, tests,
+                on_complete=lambda result: _record_progress(data, result),
+                **run_options
+            )
+        except QueueFullError as e:
+            return _queue_full_response(e)
+        
+        return jsonify({
+            'job_id': job_id,
+            'status': 'queued',
+            'status_url': f'/api/submit/{job_id}'
+        }), 202
+    
+    # Run tests
+    result = test_runner.run_tests(code, tests, **run_options)
+    _record_progress(data, result)
     
     return jsonify(result)
 
 
+@app.route('/api/submit/stream', methods=['POST'])
+def submit_solution_stream():
+    """
+    Grade a solution, streaming results as server-sent events
+    
+    Sends a 'test' event per test as soon as it finishes, then a 'summary'
+    event with the totals (or an 'error' event if grading failed).
+    Grading goes through the grading queue, so a full queue answers 429.
+    """
+    data = request.json
+    code = data.get('code', '')
+    
+    tests, cache_label, mode = _resolve_submission(data)
+    if not tests:
+        return jsonify({'error': 'Challenge not found'}), 404
+    if mode not in TestRunner.MODES:
+        return jsonify({'error': f"Unknown grading mode: {mode}"}), 400
+    
+    events = queue.Queue()
+    
+    def on_complete(result):
+        try:
+            _record_progress(data, result)
+        finally:
+            summary = {key: value for key, value in result.items() if key != 'test_results'}
+            events.put(('summary', summary))
+    
+    try:
+        grading_queue.submit(
+            code, tests,
+            on_complete=on_complete,
+            on_error=lambda error: events.put(('error', {'error': error})),
+            challenge_id=cache_label,
+            include_output=bool(data.get('include_output', False)),
+            explain=bool(data.get('explain', False)),
+            mode=mode,
+            on_test_result=lambda test_result: events.put(('test', test_result))
+        )
+    except QueueFullError as e:
+        return _queue_full_response(e)
+    
+    def stream():
+        while True:
+            kind, payload = events.get()
+            yield f"event: {kind}\ndata: {json.dumps(payload, default=str)}\n\n"
+            if kind != 'test':
+                break
+    
+    return Response(stream(), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let proxies hold events back
+    })
+
+
+@app.route('/api/submit/<job_id>')
+def submission_status(job_id):
+    """Poll the status and result of an async submission"""
+    job = grading_queue.get_job(job_id)
+    
+    if not job:
+        return jsonify({'error': 'Job not found'}), 404
+    
+    return jsonify(job)
+
+
+@app.route('/api/explain', methods=['POST'])
+def explain_failure():
+    """Full educational message for the diagnostic of a failing test"""
+    data = request.json or {}
+    diagnostic = data.get('diagnostic')
+    
+    if not isinstance(diagnostic, dict) or not diagnostic.get('code'):
+        return jsonify({'error': 'A test diagnostic is required'}), 400
+    
+    try:
+        message = render_diagnostic(diagnostic)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    return jsonify({'message': message})
+
+
+@app.route('/api/grader/stats')
+def grader_stats():
+    """Grading cache, worker pool and queue statistics"""
+    stats = test_runner.get_stats()
+    stats['queue'] = grading_queue.stats()
+    return jsonify(stats)
+
+
+@app.route('/api/grader/metrics')
+def grader_metrics():
+    """Per-submission resource percentiles for every graded challenge"""
+    return jsonify(test_runner.metrics.get_summary())
+
+
+@app.route('/api/grader/metrics/<challenge_id>')
+def challenge_grader_metrics(challenge_id):
+    """Resource percentiles for one challenge, per submission and per test"""
+    metrics = test_runner.metrics.get_challenge(challenge_id)
+    
+    if not metrics:
+        return jsonify({'error': 'No gradings recorded for this challenge'}), 404
+    
+    return jsonify(metrics)
+
+
 @app.route('/api/progress')
 def get_progress():
     """Get user progress data"""
@@ -259,6 +471,26 @@ def browse_challenges():
     return render_template('browse.html', weeks=all_challenges)
 
 
+@app.route('/api/search')
+def search_challenges():
+    """Search the curriculum by title, topic, keywords and lesson text"""
+    query = request.args.get('q', '')
+    difficulty = request.args.get('difficulty') or None
+    
+    try:
+        week = int(request.args['week']) if request.args.get('week') else None
+        limit = min(max(int(request.args.get('limit', 20)), 1), 100)
+    except ValueError:
+        return jsonify({'error': 'week and limit must be numbers'}), 400
+    
+    results = challenge_loader.search(query, difficulty=difficulty, week=week, limit=limit)
+    return jsonify({
+        'query': query,
+        'results': results,
+        'count': len(results)
+    })
+
+
 @app.route('/practice')
 def practice():
     """Practice sandbox with random challenges"""
@@ -276,57 +508,20 @@ def random_challenge():
         challenge = challenge_generator.generate_challenge(topics, difficulty)
         
         if challenge:
-            # Convert markdown to HTML for display
-            md.reset()
-            if challenge.get('description'):
-                challenge['description'] = md.convert(challenge['description'])
-                md.reset()
-            if challenge.get('instructions'):
-                challenge['instructions'] = md.convert(challenge['instructions'])
-                md.reset()
-            
-            return jsonify(challenge)
-    
-    # Fallback: Use curriculum challenges if AI not available
-    all_challenges = []
-    roadmap = challenge_loader.get_roadmap()
+            # Convert markdown to HTML for display (one-off text, so not
+            # through the curriculum's markdown cache)
+            return jsonify(render_fields(challenge))
     
-    for week_info in roadmap:
-        week_num = week_info['week']
-        week_data = challenge_loader.get_week_data(week_num)
-        if week_data:
-            for ch in week_data.get('challenges', []):
-                ch['week'] = week_num
-                ch['id'] = f"week{week_num:03d}_day{ch.get('day')}"
-                all_challenges.append(ch)
-    
-    # Filter by difficulty if specified
-    if difficulty:
-        all_challenges = [ch for ch in all_challenges if ch.get('difficulty') == difficulty]
-    
-    # Filter by topics if specified
-    if topics:
-        filtered = []
-        for ch in all_challenges:
-            keywords = ch.get('keywords', [])
-            topic = ch.get('topic', '').lower()
-            
-            if any(t.lower() in keywords or t.lower() in topic for t in topics):
-                filtered.append(ch)
-        all_challenges = filtered
-    
-    # Return random challenge from curriculum
-    import random
-    if all_challenges:
-        challenge = random.choice(all_challenges)
+    # Fallback: Use curriculum challenges if AI not available, avoiding the
+    # ones this session was shown recently
+    recent = session.get('recent_practice', [])
+    picked = challenge_loader.get_random_challenge(difficulty, topics, recent=recent)
+    
+    if picked:
+        session['recent_practice'] = ([i for i in recent if i != picked['id']] + [picked['id']])[-RECENT_LIMIT:]
         
-        md.reset()
-        if challenge.get('description'):
-            challenge['description'] = md.convert(challenge['description'])
-            md.reset()
-        if challenge.get('instructions'):
-            challenge['instructions'] = md.convert(challenge['instructions'])
-            md.reset()
+        # A copy with the (already rendered) HTML, the curriculum is unchanged
+        challenge = markdown_cache.render_fields(picked)
         
         return jsonify(challenge)
     else:
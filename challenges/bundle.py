@@ -0,0 +1,264 @@
+"""
+Curriculum Bundle
+The whole curriculum packed into one memory-mapped file
+
+Layout (little-endian):
+
+    header   magic, format version, then offset and length of the index
+             and search sections
+    records  one pickled challenge per entry, back to back
+    index    pickled {'weeks': week data with challenge summaries,
+                      'records': challenge id -> (offset, length)}
+    search   pickled search postings (see challenges.search)
+
+Loading a bundle only decodes the index. Full challenges (lessons, tests,
+starter code) are decoded from the mapping when first accessed, and the
+search postings on the first search. The mapping is shared through the
+page cache, so every worker reading the same bundle uses the same memory.
+
+Bundles are built from the week files by this app (like the compiled
+cache, they're pickles - only load bundles you built):
+
+    python -m challenges.bundle build [--source DIR] [--output FILE]
+
+The build replaces the bundle file atomically, and running workers remap it
+on their next reload check. Never copy over a bundle in place: workers
+still reading the mapped file would see it change underneath them.
+"""
+
+import argparse
+import mmap
+import os
+import pickle
+import struct
+import sys
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .compiled import parse_week_file, week_number
+from .index import CurriculumIndex, ReadOnlyDict
+
+BUNDLE_MAGIC = b'PYQUEST\x00'
+
+# Bump when the layout or the record format changes
+BUNDLE_VERSION = 1
+
+BUNDLE_FILENAME = 'curriculum.bundle'
+
+_HEADER = struct.Struct('<8sIQQQQ')
+
+# Challenge fields kept in the index, for browsing, sampling and search
+# results without decoding the full record
+SUMMARY_FIELDS = ('day', 'title', 'topic', 'difficulty', 'keywords', 'time_estimate')
+
+
+def build_bundle(challenges_dir: Path, output: Path) -> Dict:
+    """
+    Pack the week files of a directory into a bundle, returns its stats
+
+    Raises:
+        ValueError: if a week file can't be loaded (unlike the loader, a
+            build doesn't skip it)
+    """
+    from .search import SearchIndex
+
+    weeks = {}
+    for yaml_file in sorted(Path(challenges_dir).glob('week_*.yaml')):
+        try:
+            weeks[week_number(yaml_file)] = parse_week_file(yaml_file.read_bytes())
+        except Exception as e:
+            raise ValueError(f"Error loading {yaml_file}: {e}") from e
+    index = CurriculumIndex(weeks)
+
+    records = bytearray()
+    offsets = {}
+    for challenge_id in index.order:
+        payload = pickle.dumps(dict(index.by_id[challenge_id]), protocol=pickle.HIGHEST_PROTOCOL)
+        offsets[challenge_id] = (_HEADER.size + len(records), len(payload))
+        records += payload
+
+    bundle_weeks = {}
+    for week_num, week_data in index.weeks.items():
+        summaries = [
+            {field: challenge[field] for field in SUMMARY_FIELDS if field in challenge}
+            for challenge in week_data['challenges']
+        ]
+        bundle_weeks[week_num] = dict(week_data, challenges=summaries)
+
+    index_section = pickle.dumps(
+        {'weeks': bundle_weeks, 'records': offsets}, protocol=pickle.HIGHEST_PROTOCOL
+    )
+    search_section = pickle.dumps(
+        SearchIndex(index.all_challenges()).postings, protocol=pickle.HIGHEST_PROTOCOL
+    )
+
+    index_offset = _HEADER.size + len(records)
+    search_offset = index_offset + len(index_section)
+    header = _HEADER.pack(
+        BUNDLE_MAGIC, BUNDLE_VERSION,
+        index_offset, len(index_section), search_offset, len(search_section)
+    )
+
+    output = Path(output)
+    fd, tmp_path = tempfile.mkstemp(prefix=output.name + '.', dir=output.parent)
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(header)
+            f.write(records)
+            f.write(index_section)
+            f.write(search_section)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, output)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+
+    return {
+        'weeks': len(index.weeks),
+        'challenges': len(offsets),
+        'bytes': search_offset + len(search_section)
+    }
+
+
+class _MappedBundle:
+    """One open bundle file: its mapping and decoded index"""
+
+    def __init__(self, path: Path):
+        with open(path, 'rb') as f:
+            self.stat = os.fstat(f.fileno())
+            self.mapping = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        if len(self.mapping) < _HEADER.size:
+            raise ValueError(f"{path} is not a curriculum bundle")
+        magic, version, index_offset, index_length, self.search_offset, self.search_length = \
+            _HEADER.unpack_from(self.mapping)
+        if magic != BUNDLE_MAGIC:
+            raise ValueError(f"{path} is not a curriculum bundle")
+        if version != BUNDLE_VERSION:
+            raise ValueError(
+                f"{path} is bundle version {version}, expected {BUNDLE_VERSION} - "
+                f"rebuild it with: python -m challenges.bundle build"
+            )
+
+        index = pickle.loads(self.mapping[index_offset:index_offset + index_length])
+        self.weeks = index['weeks']
+        self.records = index['records']
+        self.postings = None
+
+    def decode(self, challenge_id: str) -> Optional[Dict]:
+        location = self.records.get(challenge_id)
+        if location is None:
+            return None
+        offset, length = location
+        return pickle.loads(self.mapping[offset:offset + length])
+
+    def search_postings(self) -> Dict:
+        if self.postings is None:
+            start = self.search_offset
+            self.postings = pickle.loads(self.mapping[start:start + self.search_length])
+        return self.postings
+
+
+class CurriculumBundle:
+    """
+    Loads the curriculum from a bundle, decoding challenges on demand
+
+    A drop-in source for ChallengeLoader alongside CompiledCurriculum:
+    load() returns week data whose challenges hold only SUMMARY_FIELDS, and
+    get_challenge() decodes a full challenge, keeping recently used ones.
+    A rebuilt bundle is picked up by load() after has_changes().
+    """
+
+    def __init__(self, path: Path, max_decoded: int = 1024):
+        self.path = Path(path)
+        self.max_decoded = max_decoded
+
+        self._bundle = None
+        self._decoded = OrderedDict()  # challenge id -> challenge view
+        self._lock = threading.Lock()
+        self.stats = {'decoded': 0, 'hits': 0}
+
+    def load(self) -> Dict[int, Dict]:
+        """Week data with challenge summaries, keyed by week number"""
+        bundle = _MappedBundle(self.path)
+
+        # The old mapping is left to close itself once no lookup still uses it
+        with self._lock:
+            self._bundle = bundle
+            self._decoded.clear()
+        return bundle.weeks
+
+    def has_changes(self) -> bool:
+        """True if the bundle file was replaced or modified since load()"""
+        if self._bundle is None:
+            return True
+        try:
+            stat = self.path.stat()
+        except OSError:
+            return False  # Keep serving the loaded bundle until a new one appears
+        old = self._bundle.stat
+        return (stat.st_ino, stat.st_mtime_ns, stat.st_size) != (old.st_ino, old.st_mtime_ns, old.st_size)
+
+    def get_challenge(self, challenge_id: str) -> Optional[Dict]:
+        """Full, read-only challenge data (decoded on first access)"""
+        with self._lock:
+            bundle = self._bundle
+            challenge = self._decoded.get(challenge_id)
+            if challenge is not None:
+                self._decoded.move_to_end(challenge_id)
+                self.stats['hits'] += 1
+                return challenge
+
+        data = bundle.decode(challenge_id)
+        if data is None:
+            return None
+        challenge = ReadOnlyDict(data)
+
+        with self._lock:
+            self.stats['decoded'] += 1
+            if bundle is self._bundle:
+                self._decoded[challenge_id] = challenge
+                while len(self._decoded) > self.max_decoded:
+                    self._decoded.popitem(last=False)
+        return challenge
+
+    def search_postings(self) -> Dict:
+        """Precomputed search postings of the loaded bundle"""
+        return self._bundle.search_postings()
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m challenges.bundle',
+        description='Pack the curriculum week files into a single bundle file'
+    )
+    commands = parser.add_subparsers(dest='command', required=True)
+    build = commands.add_parser('build', help='build a bundle from the week files')
+    build.add_argument('--source', type=Path, default=Path(__file__).parent / 'data',
+                       help='directory of week_*.yaml files (default: challenges/data)')
+    build.add_argument('--output', type=Path, default=None,
+                       help=f'bundle to write (default: SOURCE/{BUNDLE_FILENAME})')
+    args = parser.parse_args(argv)
+
+    output = args.output or args.source / BUNDLE_FILENAME
+    started = time.perf_counter()
+    try:
+        stats = build_bundle(args.source, output)
+    except (OSError, ValueError) as e:
+        print(f"❌ {e}", file=sys.stderr)
+        sys.exit(1)
+    elapsed = time.perf_counter() - started
+
+    print(
+        f"📦 Bundled {stats['challenges']} challenges from {stats['weeks']} weeks "
+        f"into {output} ({stats['bytes'] / 1024:.0f} KB, {elapsed:.2f}s)",
+        file=sys.stderr
+    )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,182 @@
+"""
+Compiled Curriculum Cache
+Parsed week files kept in a pickle so startup doesn't re-parse every YAML file
+"""
+
+import hashlib
+import os
+import pickle
+import tempfile
+from pathlib import Path
+from typing import Dict, Optional
+
+# Bump when the cache layout or the parsed data format changes
+CACHE_VERSION = 1
+
+CACHE_FILENAME = '.curriculum.cache'
+
+
+def week_number(path: Path) -> int:
+    """Week number of a week_NNN.yaml file"""
+    return int(path.stem.split('_')[1])
+
+
+def parse_week_file(raw: bytes) -> Optional[Dict]:
+    """Parse the contents of a week file"""
+    # Imported here so a warm cache doesn't pay for importing yaml at all
+    import yaml
+
+    # libyaml's C loader is ~10x faster; fall back to the pure-Python one
+    loader = getattr(yaml, 'CSafeLoader', yaml.SafeLoader)
+    return yaml.load(raw, Loader=loader)
+
+
+class CompiledCurriculum:
+    """
+    Loads week files through a cache of their parsed contents
+
+    Each file's entry is reused while its mtime and size are unchanged. If
+    they changed but the content hash didn't (e.g. after a checkout), the
+    entry is reused too, so only edited weeks are parsed again. The cache is
+    one pickle per challenges directory, written atomically. It's only ever
+    read from the path this app writes it to.
+
+    With persist=False nothing touches the disk, but entries are still kept
+    in memory, so reloading only parses the files that changed.
+
+    A file that fails to load keeps its last good entry, if it has one.
+    """
+
+    def __init__(self, challenges_dir: Path, cache_path: Optional[Path] = None,
+                 persist: bool = True):
+        self.challenges_dir = Path(challenges_dir)
+        if cache_path is None:
+            cache_path = self.challenges_dir / CACHE_FILENAME
+        self.cache_path = Path(cache_path)
+        self.persist = persist
+
+        # filename -> {'mtime_ns', 'size', 'sha256', 'data'}
+        self._entries = None
+        # filename -> (mtime_ns, size) of files that failed to load, so they
+        # aren't retried until they change again
+        self._failed = {}
+        self.stats = {'reused': 0, 'rehashed': 0, 'parsed': 0}
+
+    def load(self) -> Dict[int, Dict]:
+        """Parsed data of every week file, keyed by week number"""
+        if self._entries is None:
+            self._entries = self._read_cache() if self.persist else {}
+
+        entries = {}
+        failed = {}
+        changed = False
+        weeks = {}
+
+        for yaml_file in sorted(self.challenges_dir.glob('week_*.yaml')):
+            previous = self._entries.get(yaml_file.name)
+            try:
+                week_num = week_number(yaml_file)
+                entry = self._load_file(yaml_file, previous)
+            except Exception as e:
+                print(f"Error loading {yaml_file}: {e}")
+                try:
+                    stat = yaml_file.stat()
+                    failed[yaml_file.name] = (stat.st_mtime_ns, stat.st_size)
+                except OSError:
+                    pass
+                if previous is None:
+                    continue
+                # A half-saved edit shouldn't take the week offline: keep
+                # serving the last version that loaded until it's fixed
+                print(f"⚠️ Keeping the last good version of {yaml_file.name}")
+                entry = previous
+
+            if entry is not self._entries.get(yaml_file.name):
+                changed = True
+            entries[yaml_file.name] = entry
+            weeks[week_num] = entry['data']
+
+        self._failed = failed
+        if changed or entries.keys() != self._entries.keys():
+            self._entries = entries
+            if self.persist:
+                self._write_cache()
+
+        return weeks
+
+    def has_changes(self) -> bool:
+        """
+        True if week files were added, removed or modified since load()
+
+        Only stats the files, so it's cheap enough to call on every request
+        (with some throttling).
+        """
+        if self._entries is None:
+            return True
+
+        known = {name: (entry['mtime_ns'], entry['size']) for name, entry in self._entries.items()}
+        known.update(self._failed)
+
+        current = {}
+        for yaml_file in self.challenges_dir.glob('week_*.yaml'):
+            try:
+                stat = yaml_file.stat()
+            except OSError:
+                continue  # Removed while scanning
+            current[yaml_file.name] = (stat.st_mtime_ns, stat.st_size)
+        return current != known
+
+    def _load_file(self, yaml_file: Path, entry: Optional[Dict]) -> Dict:
+        """Cache entry for one week file, parsing it only if it changed"""
+        stat = yaml_file.stat()
+        if entry is not None and entry['mtime_ns'] == stat.st_mtime_ns and entry['size'] == stat.st_size:
+            self.stats['reused'] += 1
+            return entry
+
+        raw = yaml_file.read_bytes()
+        digest = hashlib.sha256(raw).hexdigest()
+        if entry is not None and entry['sha256'] == digest:
+            # Touched but not edited
+            self.stats['rehashed'] += 1
+            return dict(entry, mtime_ns=stat.st_mtime_ns, size=stat.st_size)
+
+        self.stats['parsed'] += 1
+        return {
+            'mtime_ns': stat.st_mtime_ns,
+            'size': stat.st_size,
+            'sha256': digest,
+            'data': parse_week_file(raw)
+        }
+
+    def _read_cache(self) -> Dict:
+        try:
+            with open(self.cache_path, 'rb') as f:
+                payload = pickle.load(f)
+        except FileNotFoundError:
+            return {}
+        except Exception as e:
+            print(f"Ignoring unreadable curriculum cache {self.cache_path}: {e}")
+            return {}
+
+        if not isinstance(payload, dict) or payload.get('version') != CACHE_VERSION:
+            return {}
+        return payload.get('entries', {})
+
+    def _write_cache(self):
+        """Replace the cache file atomically (other workers may be reading it)"""
+        payload = {'version': CACHE_VERSION, 'entries': self._entries}
+        try:
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=self.cache_path.name + '.', dir=self.cache_path.parent
+            )
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    pickle.dump(payload, f, protocol=pickle.HIGHEST_PROTOCOL)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self.cache_path)
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            # A read-only checkout still works, just without the speedup
+            print(f"Could not write curriculum cache {self.cache_path}: {e}")
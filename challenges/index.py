@@ -0,0 +1,105 @@
+"""
+Curriculum Index
+Read-only snapshot of the curriculum with constant-time lookups
+"""
+
+from typing import Dict, List, Optional, Tuple
+
+
+def make_challenge_id(week: int, day: int) -> str:
+    """Challenge ID for a week and day (e.g. 'week001_day1')"""
+    return f"week{week:03d}_day{day}"
+
+
+class ReadOnlyDict(dict):
+    """
+    A dict that refuses to be changed
+
+    Still a real dict, so jsonify, tojson and templates work unchanged.
+    Only the top level is protected - nested lists and dicts (tests,
+    hints, ...) are shared with the index and must not be modified either.
+    Make a copy with dict(view) to change anything.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError(f"{type(self).__name__} is read-only - copy it with dict(...) first")
+
+    __setitem__ = __delitem__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+    __ior__ = _read_only
+
+    def __reduce__(self):
+        # The default pickling protocol would call __setitem__
+        return (type(self), (dict(self),))
+
+
+class CurriculumIndex:
+    """
+    Indexes built once from the parsed week files
+
+    Every challenge gets its 'week' and 'id' filled in, and can be found by
+    (week, day) or by ID, with links to the previous and next challenge in
+    curriculum order. A new index is built rather than updating this one,
+    so holders of an index always see a consistent curriculum.
+    """
+
+    def __init__(self, weeks: Dict[int, Dict]):
+        self.weeks = {}        # week -> week data view ('challenges' is a tuple of views)
+        self.by_id = {}        # challenge id -> challenge view
+        self.by_week_day = {}  # (week, day) -> challenge view
+        self.order = []        # challenge ids in curriculum order
+
+        roadmap = []
+        for week_num in sorted(weeks):
+            week_data = weeks[week_num] or {}
+
+            views = []
+            for challenge in week_data.get('challenges', []):
+                day = challenge.get('day')
+                challenge_id = make_challenge_id(week_num, day)
+                view = ReadOnlyDict(challenge, week=week_num, id=challenge_id)
+                views.append(view)
+
+                # First one wins if a day appears twice, as it always has
+                if (week_num, day) not in self.by_week_day:
+                    self.by_week_day[(week_num, day)] = view
+                    self.by_id[challenge_id] = view
+
+            self.weeks[week_num] = ReadOnlyDict(week_data, challenges=tuple(views))
+            for view in sorted(views, key=lambda c: c.get('day') or 0):
+                if self.by_id.get(view['id']) is view:
+                    self.order.append(view['id'])
+
+            roadmap.append(ReadOnlyDict({
+                'week': week_num,
+                'title': week_data.get('title', f'Week {week_num}'),
+                'description': week_data.get('description', ''),
+                'topics': week_data.get('topics', []),
+                'challenge_count': len(views)
+            }))
+        self.roadmap = tuple(roadmap)
+
+        # Previous / next challenge IDs in curriculum order
+        self.links = {}
+        for i, challenge_id in enumerate(self.order):
+            self.links[challenge_id] = (
+                self.order[i - 1] if i > 0 else None,
+                self.order[i + 1] if i + 1 < len(self.order) else None
+            )
+
+    def get(self, week: int, day: int) -> Optional[Dict]:
+        return self.by_week_day.get((week, day))
+
+    def get_by_id(self, challenge_id: str) -> Optional[Dict]:
+        if not isinstance(challenge_id, str):
+            return None
+        return self.by_id.get(challenge_id)
+
+    def get_neighbors(self, challenge_id: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """(previous, next) challenge views, None at either end"""
+        prev_id, next_id = self.links.get(challenge_id, (None, None))
+        return self.by_id.get(prev_id), self.by_id.get(next_id)
+
+    def all_challenges(self) -> List[Dict]:
+        """Every challenge view in curriculum order"""
+        return [self.by_id[challenge_id] for challenge_id in self.order]
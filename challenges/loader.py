@@ -3,83 +3,152 @@ Challenge Loader
 Loads and manages Python challenges from YAML files
 """
 
-import yaml
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional, Tuple
 import os
+import threading
+import time
+
+from .index import CurriculumIndex
+from .compiled import CompiledCurriculum
+from .sampler import ChallengeSampler
+from .search import SearchIndex
+from progress.cursor import CompletionCursor
 
 
 class ChallengeLoader:
     """Loads and manages Python learning challenges"""
     
-    def __init__(self, challenges_dir: str = None):
+    def __init__(self, challenges_dir: str = None, cache_path: str = None, use_cache: bool = True,
+                 reload_interval: float = None, progress=None, bundle_path: str = None):
         if challenges_dir is None:
             challenges_dir = Path(__file__).parent / 'data'
         self.challenges_dir = Path(challenges_dir)
         self.challenges_cache = {}
+        
+        if bundle_path:
+            # One memory-mapped file; challenges are decoded when first used
+            # and the index only holds their summaries (see challenges.bundle,
+            # imported here since it's also run as a script)
+            from .bundle import CurriculumBundle
+            self.source = CurriculumBundle(bundle_path)
+            self.source_path = Path(bundle_path)
+            self.lazy = True
+        else:
+            # Parsed week files, also cached on disk unless use_cache is False
+            # (see challenges.compiled)
+            self.source = CompiledCurriculum(self.challenges_dir, cache_path, persist=use_cache)
+            self.source_path = self.challenges_dir
+            self.lazy = False
+        
+        # Seconds between checks for edited week files (None = never reload)
+        self.reload_interval = reload_interval
+        self._last_check = time.monotonic()
+        self._reload_lock = threading.Lock()
+        self._reload_listeners = []
+        
+        # Start date of the learner's schedule, kept current by the progress
+        # tracker (None = starting today)
+        self._start_date = None
+        if progress is not None:
+            self.set_progress_source(progress)
+        
         self._load_all_challenges()
     
     def _load_all_challenges(self):
-        """Load all challenge files into cache"""
-        for yaml_file in sorted(self.challenges_dir.glob('week_*.yaml')):
-            week_num = int(yaml_file.stem.split('_')[1])
-            try:
-                with open(yaml_file, 'r') as f:
-                    data = yaml.safe_load(f)
-                    self.challenges_cache[week_num] = data
-            except Exception as e:
-                print(f"Error loading {yaml_file}: {e}")
+        """Load all challenge files into cache and index them"""
+        self.challenges_cache = self.source.load()
+        
+        # Lookups go through this snapshot, which is never modified - a
+        # reload builds a new one and swaps it in, so a lookup never sees a
+        # half-reloaded curriculum
+        self.index = CurriculumIndex(self.challenges_cache)
+        self.sampler = ChallengeSampler(self.index.all_challenges())
+        self._search = None  # (index, SearchIndex), built on the first search
     
-    def get_challenge(self, week: int, day: int) -> Optional[Dict]:
-        """Get a specific challenge by week and day"""
-        if week not in self.challenges_cache:
-            return None
+    @property
+    def search_index(self) -> SearchIndex:
+        """Search index of the current curriculum"""
+        index = self.index
+        search = self._search
+        if search is None or search[0] is not index:
+            if self.lazy:
+                search_index = SearchIndex(index.all_challenges(), postings=self.source.search_postings())
+            else:
+                search_index = SearchIndex(index.all_challenges())
+            search = self._search = (index, search_index)
+        return search[1]
+    
+    def _resolve(self, challenge: Optional[Dict]) -> Optional[Dict]:
+        """Full data of an index entry (only a summary when loading a bundle)"""
+        if challenge is None or not self.lazy:
+            return challenge
+        return self.source.get_challenge(challenge['id'])
+    
+    def set_progress_source(self, progress):
+        """Take the schedule's start date from a ProgressTracker, following its changes"""
+        def update_start_date(tracker):
+            self._start_date = tracker.get_start_date()
         
-        week_data = self.challenges_cache[week]
-        challenges = week_data.get('challenges', [])
+        update_start_date(progress)
+        progress.add_change_listener(update_start_date)
+    
+    def add_reload_listener(self, callback: Callable[['ChallengeLoader'], None]):
+        """Call `callback(loader)` every time the curriculum is reloaded"""
+        self._reload_listeners.append(callback)
+    
+    def reload_if_changed(self) -> bool:
+        """
+        Reload week files that were added, removed or edited
         
-        for challenge in challenges:
-            if challenge.get('day') == day:
-                challenge['week'] = week
-                challenge['id'] = f"week{week:03d}_day{day}"
-                return challenge
+        Checks at most every `reload_interval` seconds by comparing file
+        mtimes, and only re-parses the files that changed (or remaps a
+        rebuilt bundle). Returns True if the curriculum was reloaded.
+        """
+        if self.reload_interval is None:
+            return False
+        if time.monotonic() - self._last_check < self.reload_interval:
+            return False
         
-        return None
+        # One thread checks, the others carry on with the current snapshot
+        if not self._reload_lock.acquire(blocking=False):
+            return False
+        try:
+            self._last_check = time.monotonic()
+            if not self.source.has_changes():
+                return False
+            try:
+                self._load_all_challenges()
+            except Exception as e:
+                # e.g. a bundle from another version - keep serving this one
+                print(f"Error reloading challenges from {self.source_path}: {e}")
+                return False
+        finally:
+            self._reload_lock.release()
+        
+        print(f"🔄 Reloaded challenges from {self.source_path}")
+        for callback in self._reload_listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Error in challenge reload listener: {e}")
+        return True
+    
+    def get_challenge(self, week: int, day: int) -> Optional[Dict]:
+        """Get a specific challenge by week and day (read-only)"""
+        return self._resolve(self.index.get(week, day))
     
     def get_today_challenge(self) -> Optional[Dict]:
         """Get today's challenge based on start date"""
-        # Calculate days since start (you started today!)
-        start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        # Check if there's a saved start date
-        progress_file = Path('user_progress.json')
-        if progress_file.exists():
-            import json
-            with open(progress_file, 'r') as f:
-                data = json.load(f)
-                if 'start_date' in data:
-                    start_date = datetime.fromisoformat(data['start_date'])
-        
-        days_since_start = (datetime.now() - start_date).days
-        
-        # Calculate week and day
-        week = (days_since_start // 7) + 1
-        day = (days_since_start % 7) + 1
-        
-        return self.get_challenge(week, day)
+        return self.get_challenge_by_day(0)
     
     def get_challenge_by_day(self, day_offset: int = 0) -> Optional[Dict]:
         """Get challenge by day offset (0 = today, 1 = tomorrow, -1 = yesterday)"""
-        start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
-        
-        progress_file = Path('user_progress.json')
-        if progress_file.exists():
-            import json
-            with open(progress_file, 'r') as f:
-                data = json.load(f)
-                if 'start_date' in data:
-                    start_date = datetime.fromisoformat(data['start_date'])
+        start_date = self._start_date
+        if start_date is None:
+            # No progress yet - you started today!
+            start_date = datetime.now().replace(hour=0, minute=0, second=0, microsecond=0)
         
         target_date = datetime.now() + timedelta(days=day_offset)
         days_since_start = (target_date - start_date).days
@@ -91,49 +160,50 @@ class ChallengeLoader:
     
     def get_challenge_by_id(self, challenge_id: str) -> Optional[Dict]:
         """Get challenge by ID (e.g., 'week001_day1')"""
-        try:
-            parts = challenge_id.split('_')
-            week = int(parts[0].replace('week', ''))
-            day = int(parts[1].replace('day', ''))
-            return self.get_challenge(week, day)
-        except:
-            return None
+        return self._resolve(self.index.get_by_id(challenge_id))
+    
+    def search(self, query: str, difficulty: str = None, week: int = None, limit: int = 20) -> List[Dict]:
+        """Ranked challenge summaries matching a search query (see challenges.search)"""
+        return self.search_index.search(query, difficulty=difficulty, week=week, limit=limit)
+    
+    def get_random_challenge(self, difficulty: str = None, topics: List[str] = (),
+                             recent: List[str] = ()) -> Optional[Dict]:
+        """Random challenge matching the difficulty and any topic, avoiding recent IDs"""
+        return self._resolve(self.sampler.pick(difficulty=difficulty, topics=topics, recent=recent))
+    
+    def get_neighbors(self, challenge_id: str) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Get the (previous, next) challenges in curriculum order (summaries only when lazy)"""
+        return self.index.get_neighbors(challenge_id)
+    
+    def get_all_challenges(self) -> List[Dict]:
+        """Get every challenge in curriculum order (decodes the whole bundle when lazy)"""
+        return [self._resolve(challenge) for challenge in self.index.all_challenges()]
     
     def get_roadmap(self) -> List[Dict]:
         """Get the full learning roadmap"""
-        roadmap = []
-        for week_num in sorted(self.challenges_cache.keys()):
-            week_data = self.challenges_cache[week_num]
-            roadmap.append({
-                'week': week_num,
-                'title': week_data.get('title', f'Week {week_num}'),
-                'description': week_data.get('description', ''),
-                'topics': week_data.get('topics', []),
-                'challenge_count': len(week_data.get('challenges', []))
-            })
-        return roadmap
+        return list(self.index.roadmap)
     
     def get_week_data(self, week: int) -> Optional[Dict]:
-        """Get all data for a specific week"""
-        return self.challenges_cache.get(week)
+        """Get all data for a specific week (challenge summaries only when lazy)"""
+        return self.index.weeks.get(week)
     
-    def get_next_uncompleted_challenge(self, completed_ids: List[str]) -> Optional[Dict]:
-        """Get the next challenge that hasn't been completed"""
+    def get_next_uncompleted_challenge(self, completed_ids) -> Optional[Dict]:
+        """
+        Get the next challenge that hasn't been completed
+        
+        `completed_ids` is a list of completed challenge IDs, or a
+        CompletionCursor, which remembers its place between calls.
+        """
+        index = self.index
+        if isinstance(completed_ids, CompletionCursor):
+            return self._resolve(index.get_by_id(completed_ids.next_id(index.order)))
+        
+        completed = set(completed_ids)
+        
         # Go through all weeks and days in order
-        for week_num in sorted(self.challenges_cache.keys()):
-            week_data = self.challenges_cache[week_num]
-            challenges = week_data.get('challenges', [])
-            
-            # Sort by day
-            for challenge in sorted(challenges, key=lambda c: c.get('day', 0)):
-                day = challenge.get('day')
-                challenge_id = f"week{week_num:03d}_day{day}"
-                
-                # If this challenge is not completed, return it
-                if challenge_id not in completed_ids:
-                    challenge['week'] = week_num
-                    challenge['id'] = challenge_id
-                    return challenge
+        for challenge_id in index.order:
+            if challenge_id not in completed:
+                return self._resolve(index.by_id[challenge_id])
         
         # All challenges completed!
         return None
@@ -0,0 +1,249 @@
+"""
+Markdown Rendering
+Challenge text converted to HTML once and cached by content hash
+"""
+
+import hashlib
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Optional
+
+MARKDOWN_EXTENSIONS = ('fenced_code', 'tables', 'nl2br')
+
+# Challenge fields shown as markdown (resources is a list of strings)
+MARKDOWN_FIELDS = ('description', 'instructions', 'resources')
+
+# Fields a challenge page or practice response gets as HTML
+PAGE_FIELDS = ('description', 'instructions')
+
+# Share of max_disk_bytes left after pruning, so pruning isn't redone on
+# every write once the directory is full
+_PRUNE_TO = 0.8
+
+
+# One converter per thread: a Markdown instance keeps state between reset()
+# and convert(), so sharing one across request threads mixes up documents,
+# and a lock around it would serialize every render
+_local = threading.local()
+
+
+def _converter():
+    converter = getattr(_local, 'converter', None)
+    if converter is None:
+        # Imported here so a warm disk cache doesn't pay for importing markdown
+        import markdown
+
+        converter = _local.converter = markdown.Markdown(extensions=list(MARKDOWN_EXTENSIONS))
+    return converter
+
+
+def render_markdown(text: str) -> str:
+    """Convert markdown to HTML (uncached, safe to call from any thread)"""
+    converter = _converter()
+    try:
+        return converter.convert(text)
+    finally:
+        converter.reset()
+
+
+def render_fields(challenge: Dict, fields: Iterable[str] = PAGE_FIELDS,
+                  render: Callable[[str], str] = render_markdown) -> Dict:
+    """
+    Copy of a challenge with its markdown fields converted to HTML
+
+    Uncached by default, for one-off text like generated practice challenges
+    (curriculum text goes through MarkdownCache.render_fields).
+    """
+    rendered = dict(challenge)
+    for field in fields:
+        if rendered.get(field):
+            rendered[field] = render(rendered[field])
+    return rendered
+
+
+def _render_key(text: str) -> str:
+    """Hash of the text and everything else that changes its HTML"""
+    payload = f"{','.join(MARKDOWN_EXTENSIONS)}\0{text}"
+    return hashlib.sha256(payload.encode('utf-8', 'surrogatepass')).hexdigest()
+
+
+class MarkdownCache:
+    """
+    Thread-safe LRU cache of rendered markdown, bounded by size
+
+    Keyed by a hash of the markdown, so an edited lesson is simply a new
+    entry and the old one ages out. With a cache_dir, rendered HTML is also
+    kept on disk (one file per hash) and survives restarts. Files there are
+    never stale, only unused - the directory can be deleted at any time, and
+    once it holds more than max_disk_bytes the least recently used files
+    are deleted.
+    """
+
+    def __init__(self, max_bytes: int = 16 * 1024 * 1024, cache_dir: Optional[Path] = None,
+                 max_disk_bytes: int = 64 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.max_disk_bytes = max_disk_bytes
+
+        # Estimated size of cache_dir: measured on the first write, then
+        # counted up (other workers write there too, so pruning re-measures)
+        self._disk_bytes = None
+
+        self._entries = OrderedDict()  # key -> html
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def render(self, text: str) -> str:
+        """HTML for a markdown string, rendered at most once per process"""
+        if not text:
+            return ''
+
+        key = _render_key(text)
+        with self._lock:
+            html = self._entries.get(key)
+            if html is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return html
+
+        html = self._read_disk(key)
+        if html is not None:
+            with self._lock:
+                self.disk_hits += 1
+        else:
+            html = render_markdown(text)
+            with self._lock:
+                self.misses += 1
+            self._write_disk(key, html)
+
+        self._store(key, html)
+        return html
+
+    def warm(self, challenges: Iterable[Dict], fields: Iterable[str] = MARKDOWN_FIELDS):
+        """Render the markdown fields of every challenge ahead of the first view"""
+        for challenge in challenges:
+            for field in fields:
+                value = challenge.get(field)
+                if isinstance(value, str):
+                    self.render(value)
+                elif isinstance(value, (list, tuple)):
+                    for item in value:
+                        if isinstance(item, str):
+                            self.render(item)
+
+    def render_fields(self, challenge: Dict, fields: Iterable[str] = PAGE_FIELDS) -> Dict:
+        """Copy of a challenge with its markdown fields converted to HTML"""
+        return render_fields(challenge, fields, render=self.render)
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.disk_hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'hit_rate': round((self.hits + self.disk_hits) / lookups, 3) if lookups else 0.0
+            }
+
+    def _store(self, key: str, html: str):
+        size = len(html)
+        if size > self.max_bytes:
+            return  # Would evict everything else; render it each time instead
+
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = html
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._bytes -= len(evicted)
+
+    def _disk_path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.html"
+
+    def _read_disk(self, key: str) -> Optional[str]:
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            html = path.read_text(encoding='utf-8')
+        except FileNotFoundError:
+            return None
+        except (OSError, UnicodeDecodeError) as e:
+            print(f"Ignoring unreadable markdown cache entry {key}: {e}")
+            return None
+
+        # Mark it used, so pruning deletes it last
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return html
+
+    def _write_disk(self, key: str, html: str):
+        """Write an entry atomically (other workers may be reading it)"""
+        if self.cache_dir is None:
+            return
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(prefix=f".{key}.", dir=self.cache_dir)
+            try:
+                with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                    f.write(html)
+                os.chmod(tmp_path, 0o644)
+                os.replace(tmp_path, self._disk_path(key))
+            except BaseException:
+                os.unlink(tmp_path)
+                raise
+        except OSError as e:
+            # Still cached in memory, just not across restarts
+            print(f"Could not write markdown cache entry {key}: {e}")
+            return
+
+        with self._lock:
+            if self._disk_bytes is None:
+                self._disk_bytes = sum(size for _, size, _ in self._disk_files())
+            else:
+                self._disk_bytes += len(html.encode('utf-8'))
+            if self._disk_bytes <= self.max_disk_bytes:
+                return
+            self._disk_bytes = self._prune_disk()
+
+    def _disk_files(self):
+        """(mtime, size, path) of every entry on disk"""
+        files = []
+        for path in self.cache_dir.glob('*.html'):
+            try:
+                stat = path.stat()
+            except OSError:
+                continue  # Pruned by another worker
+            files.append((stat.st_mtime, stat.st_size, path))
+        return files
+
+    def _prune_disk(self) -> int:
+        """Delete least recently used files down to _PRUNE_TO of the bound, returns the size left"""
+        files = sorted(self._disk_files())
+        total = sum(size for _, size, _ in files)
+        target = self.max_disk_bytes * _PRUNE_TO
+        for _, size, path in files:
+            if total <= target:
+                break
+            try:
+                path.unlink()
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                print(f"Could not prune markdown cache entry {path.name}: {e}")
+                continue
+            total -= size
+        return total
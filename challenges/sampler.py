@@ -0,0 +1,86 @@
+"""
+Challenge Sampler
+Random practice picks from precomputed difficulty and topic buckets
+"""
+
+import random
+from collections import defaultdict
+from typing import Dict, Iterable, List, Optional, Sequence
+
+# How many recently served challenges a session avoids repeating
+RECENT_LIMIT = 10
+
+# Random draws tried before listing the matching challenges that weren't
+# served recently and picking from those (when most matches are recent)
+MAX_DRAWS = 8
+
+
+def challenge_tags(challenge: Dict) -> frozenset:
+    """Lowercase keywords and topic words a practice topic can match"""
+    tags = {str(keyword).lower() for keyword in challenge.get('keywords') or []}
+    tags.update(str(challenge.get('topic') or '').lower().split())
+    return frozenset(tags)
+
+
+class ChallengeSampler:
+    """
+    Picks random challenges by difficulty and topic in constant time
+
+    Challenges are bucketed by (difficulty, tag) when the curriculum is
+    indexed, with None standing for "any". A pick over several topics draws
+    a bucket weighted by its size, then a challenge from it, and keeps it
+    with probability 1 / (number of chosen buckets it is in), so challenges
+    tagged with more than one requested topic aren't favoured.
+    """
+
+    def __init__(self, challenges: Iterable[Dict]):
+        self.buckets = defaultdict(list)  # (difficulty or None, tag or None) -> challenges
+        self.tags = {}                    # challenge id -> tags
+
+        for challenge in challenges:
+            tags = challenge_tags(challenge)
+            self.tags[challenge['id']] = tags
+            for difficulty in (None, challenge.get('difficulty')):
+                self.buckets[(difficulty, None)].append(challenge)
+                for tag in tags:
+                    self.buckets[(difficulty, tag)].append(challenge)
+
+        self.buckets = {key: tuple(bucket) for key, bucket in self.buckets.items()}
+
+    def pick(self, difficulty: Optional[str] = None, topics: Sequence[str] = (),
+             recent: Iterable[str] = ()) -> Optional[Dict]:
+        """
+        A random challenge matching the difficulty and any of the topics
+
+        Challenges whose IDs are in `recent` are only picked if every
+        match is recent. Returns None if no challenge matches at all.
+        """
+        difficulty = difficulty or None
+        tags = {topic.lower() for topic in topics if topic} or {None}
+        buckets = [self.buckets[(difficulty, tag)] for tag in tags if (difficulty, tag) in self.buckets]
+        if not buckets:
+            return None
+
+        recent = set(recent)
+        weights = [len(bucket) for bucket in buckets]
+        for _ in range(MAX_DRAWS):
+            choice = self._draw(buckets, weights, tags)
+            if choice['id'] not in recent:
+                return choice
+
+        # Mostly recent matches: pick from the rest directly (still uniform)
+        matches = {challenge['id']: challenge for bucket in buckets for challenge in bucket}
+        fresh = [challenge for challenge_id, challenge in matches.items() if challenge_id not in recent]
+        return random.choice(fresh or list(matches.values()))
+
+    def _draw(self, buckets: List[tuple], weights: List[int], tags: set) -> Dict:
+        """One challenge, uniformly from the union of the buckets"""
+        while True:
+            bucket = buckets[0] if len(buckets) == 1 else random.choices(buckets, weights)[0]
+            challenge = random.choice(bucket)
+            if len(buckets) == 1:
+                return challenge
+
+            copies = len(tags & self.tags[challenge['id']])
+            if copies == 1 or random.random() * copies < 1:
+                return challenge
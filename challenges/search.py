@@ -0,0 +1,173 @@
+"""
+Curriculum Search
+Inverted index over challenge titles, topics, keywords and lesson text
+"""
+
+import heapq
+import re
+from bisect import bisect_left
+from collections import defaultdict
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+_TOKEN = re.compile(r"[a-z0-9_]+")
+
+# Words too common in lessons to say anything about a challenge
+STOP_WORDS = frozenset("""
+    a an and are as at be by can do does for from has have how i if in into is it
+    its let me my not of on or so than that the their them then there these this
+    to up use using we what when which will with you your
+""".split())
+
+# How much a match in each field counts towards a challenge's score
+FIELD_WEIGHTS = {
+    'title': 8.0,
+    'topic': 5.0,
+    'keywords': 5.0,
+    'description': 1.0,
+    'instructions': 1.0,
+}
+
+# A prefix match counts for less than the whole word
+PREFIX_WEIGHT = 0.5
+
+# Shorter query words only match whole words ('s' shouldn't walk the whole
+# vocabulary), and a prefix expands to at most this many words
+MIN_PREFIX_LENGTH = 3
+MAX_PREFIX_EXPANSIONS = 64
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase words of a text, without stop words"""
+    return [token for token in _TOKEN.findall(text.lower()) if token not in STOP_WORDS]
+
+
+def _field_text(value) -> str:
+    if isinstance(value, str):
+        return value
+    if isinstance(value, (list, tuple)):
+        return ' '.join(item for item in value if isinstance(item, str))
+    return ''
+
+
+class SearchIndex:
+    """
+    Ranked full-text search over a curriculum snapshot
+
+    Each word maps to the challenges containing it with a precomputed score
+    (field weight, damped by how often it repeats), and the sorted vocabulary
+    turns prefix matching into a binary search. Every query word has to
+    match, exactly or as a prefix; results are ranked by total score, then
+    curriculum order. Built once per curriculum, like CurriculumIndex.
+
+    Pass `postings` computed earlier (e.g. from a curriculum bundle) to skip
+    tokenizing; the challenges then only need their summary fields.
+    """
+
+    def __init__(self, challenges: Iterable[Dict], postings: Optional[Dict] = None):
+        self.challenges = {}     # challenge id -> challenge view
+        self.positions = {}      # challenge id -> curriculum position
+        for position, challenge in enumerate(challenges):
+            self.challenges[challenge['id']] = challenge
+            self.positions[challenge['id']] = position
+
+        # word -> {challenge id: score}
+        self.postings = postings if postings is not None else self._build_postings(self.challenges)
+        self.vocabulary = sorted(self.postings)
+
+        # Type-ahead repeats the same words and prefixes; the index never
+        # changes, so their matches can be reused (and must not be modified)
+        self._match_term = lru_cache(maxsize=1024)(self._match_term)
+
+    @staticmethod
+    def _build_postings(challenges: Dict[str, Dict]) -> Dict[str, Dict[str, float]]:
+        postings = defaultdict(dict)
+        for challenge_id, challenge in challenges.items():
+            scores = defaultdict(float)
+            for field, weight in FIELD_WEIGHTS.items():
+                counts = defaultdict(int)
+                for token in tokenize(_field_text(challenge.get(field))):
+                    counts[token] += 1
+                for token, count in counts.items():
+                    # Repeats help, but a lesson that says "list" forty times
+                    # shouldn't outrank one with "list" in the title
+                    scores[token] += weight * (1 + 0.1 * min(count - 1, 10))
+
+            for token, score in scores.items():
+                postings[token][challenge_id] = score
+        return dict(postings)
+
+    def search(self, query: str, difficulty: Optional[str] = None, week: Optional[int] = None,
+               limit: int = 20) -> List[Dict]:
+        """
+        Challenges matching every word of the query, best first
+
+        An empty query lists every challenge that passes the filters, in
+        curriculum order. Each result is a summary dict with a 'score'.
+        """
+        terms = tokenize(query or '')
+
+        if terms:
+            # Intersect starting from the rarest word, so the set only shrinks
+            term_matches = sorted((self._match_term(term) for term in dict.fromkeys(terms)), key=len)
+            scores = term_matches[0]
+            for matches in term_matches[1:]:
+                scores = {
+                    challenge_id: score + matches[challenge_id]
+                    for challenge_id, score in scores.items()
+                    if challenge_id in matches
+                }
+                if not scores:
+                    return []
+        else:
+            scores = dict.fromkeys(self.challenges, 0.0)
+
+        ranked = []
+        for challenge_id, score in scores.items():
+            challenge = self.challenges.get(challenge_id)
+            if challenge is None:
+                continue  # Postings of a newer bundle than these challenges
+            if difficulty and challenge.get('difficulty') != difficulty:
+                continue
+            if week is not None and challenge.get('week') != week:
+                continue
+            ranked.append((-score, self.positions[challenge_id], challenge_id))
+
+        # Only the top results need sorting
+        return [
+            self._summary(self.challenges[challenge_id], -neg_score)
+            for neg_score, _, challenge_id in heapq.nsmallest(limit, ranked)
+        ]
+
+    def _match_term(self, term: str) -> Dict[str, float]:
+        """Score of every challenge containing the word, or a word it starts"""
+        matches = dict(self.postings.get(term, {}))
+        if len(term) < MIN_PREFIX_LENGTH:
+            return matches
+
+        start = bisect_left(self.vocabulary, term)
+        expansions = 0
+        for word in self.vocabulary[start:start + MAX_PREFIX_EXPANSIONS + 1]:
+            if not word.startswith(term):
+                break
+            if word == term:
+                continue
+            expansions += 1
+            if expansions > MAX_PREFIX_EXPANSIONS:
+                break
+            for challenge_id, score in self.postings[word].items():
+                matches[challenge_id] = max(matches.get(challenge_id, 0.0), score * PREFIX_WEIGHT)
+        return matches
+
+    @staticmethod
+    def _summary(challenge: Dict, score: float) -> Dict:
+        return {
+            'id': challenge['id'],
+            'week': challenge.get('week'),
+            'day': challenge.get('day'),
+            'title': challenge.get('title', ''),
+            'topic': challenge.get('topic', ''),
+            'difficulty': challenge.get('difficulty', ''),
+            'time_estimate': challenge.get('time_estimate', ''),
+            'score': round(score, 2)
+        }
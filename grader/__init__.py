@@ -1,5 +1,10 @@
 """Grader package - test execution and validation"""
 
 from .test_runner import TestRunner
+from .sandbox import SandboxPool
+from .cache import ResultCache
+from .jobs import GradingQueue, QueueFullError
+from .metrics import GradingMetrics
 
-__all__ = ['TestRunner']
+__all__ = ['TestRunner', 'SandboxPool', 'ResultCache', 'GradingQueue', 'QueueFullError',
+           'GradingMetrics']
@@ -0,0 +1,188 @@
+"""
+Code Analysis
+One static analysis pass per submission, shared by validation and grading
+
+The analysis records what a submission imports, which functions it calls,
+what it defines at the top level and whether it uses anything the grader
+refuses to run. It is cached, so re-submitting the same code (or asking to
+validate it first) doesn't parse it again.
+
+The forbidden list is a fast, friendly early rejection. It is not a
+security boundary: the sandbox pool is.
+"""
+
+import ast
+import hashlib
+import threading
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from typing import Dict, List
+
+from .fingerprint import fingerprint_tree
+
+# Modules whose import (or submodules) stops a submission from being graded
+FORBIDDEN_IMPORTS = (
+    'subprocess', 'ctypes', 'socket', 'multiprocessing', 'signal', 'pty', 'resource'
+)
+
+# Calls (after resolving import aliases) that stop a submission, * is a wildcard
+FORBIDDEN_CALLS = (
+    '__import__', 'os.system', 'os.popen', 'os.fork', 'os.forkpty',
+    'os.kill', 'os.killpg', 'os._exit', 'os.exec*', 'os.spawn*'
+)
+
+# Imports and calls that are allowed but worth a warning
+_SYSTEM_MODULES = ('os', 'sys')
+_DYNAMIC_CALLS = ('exec', 'eval', 'compile', '__import__')
+
+
+def _dotted_name(node) -> str:
+    """'a.b.c' for a chain of attribute lookups on a name, else None"""
+    parts = []
+    while isinstance(node, ast.Attribute):
+        parts.append(node.attr)
+        node = node.value
+    if not isinstance(node, ast.Name):
+        return None
+    parts.append(node.id)
+    return '.'.join(reversed(parts))
+
+
+def _matches_module(module: str, patterns) -> bool:
+    return any(module == pattern or module.startswith(pattern + '.') for pattern in patterns)
+
+
+class CodeAnalyzer:
+    """Analyses submissions and caches the results per source text"""
+
+    def __init__(self, max_entries: int = 1024, forbidden_imports=FORBIDDEN_IMPORTS,
+                 forbidden_calls=FORBIDDEN_CALLS):
+        self.max_entries = max_entries
+        self.forbidden_imports = tuple(forbidden_imports)
+        self.forbidden_calls = tuple(forbidden_calls)
+
+        self._entries = OrderedDict()  # sha256 of source -> analysis
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def analyze(self, user_code: str) -> Dict:
+        """
+        Analysis of a submission (cached - treat the result as read-only)
+
+        Returns a dictionary with:
+            fingerprint: see grader.fingerprint
+            source_hash: sha256 of the exact source
+            code: the compiled module, ready to exec (compiled from the
+                same tree, so the source is only parsed once)
+            imports: modules imported, including 'module.name' for from-imports
+            calls: names called, with import aliases resolved ('os.system')
+            functions / classes: names defined at the top level
+            top_level: statement types at the top level, in order
+            forbidden: [{'construct', 'line'}] that stop the code being graded
+            warnings: messages about risky but allowed code
+
+        Raises:
+            SyntaxError: if the code doesn't parse (not cached)
+        """
+        key = hashlib.sha256(user_code.encode('utf-8', 'surrogatepass')).hexdigest()
+        with self._lock:
+            analysis = self._entries.get(key)
+            if analysis is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return analysis
+            self.misses += 1
+
+        tree = ast.parse(user_code)
+        analysis = self._analyze_tree(tree)
+        analysis['source_hash'] = key
+        analysis['code'] = compile(tree, '<string>', 'exec')
+
+        with self._lock:
+            self._entries[key] = analysis
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return analysis
+
+    def stats(self) -> Dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+    def _analyze_tree(self, tree: ast.Module) -> Dict:
+        imports = []     # (module, line)
+        aliases = {}     # local name -> qualified name
+        raw_calls = []   # (dotted name, line)
+
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                for alias in node.names:
+                    imports.append((alias.name, node.lineno))
+                    if alias.asname:
+                        aliases[alias.asname] = alias.name
+            elif isinstance(node, ast.ImportFrom):
+                module = '.' * node.level + (node.module or '')
+                imports.append((module, node.lineno))
+                for alias in node.names:
+                    imports.append((f"{module}.{alias.name}", node.lineno))
+                    aliases[alias.asname or alias.name] = f"{module}.{alias.name}"
+            elif isinstance(node, ast.Call):
+                name = _dotted_name(node.func)
+                if name is not None:
+                    raw_calls.append((name, node.lineno))
+
+        calls = []
+        for name, line in raw_calls:
+            head, _, rest = name.partition('.')
+            if head in aliases:
+                name = aliases[head] + ('.' + rest if rest else '')
+            calls.append((name, line))
+
+        forbidden = []
+        for module, line in imports:
+            if _matches_module(module, self.forbidden_imports):
+                forbidden.append({'construct': f"import {module}", 'line': line})
+        for name, line in calls:
+            if any(fnmatchcase(name, pattern) for pattern in self.forbidden_calls):
+                forbidden.append({'construct': f"{name}()", 'line': line})
+        forbidden.sort(key=lambda item: item['line'])
+
+        call_names = {name for name, _ in calls}
+        warnings = []
+        if any(_matches_module(module, _SYSTEM_MODULES) for module, _ in imports):
+            warnings.append("System imports detected - be careful!")
+        if call_names.intersection(_DYNAMIC_CALLS):
+            warnings.append("Dynamic execution detected - this can be dangerous!")
+
+        return {
+            'fingerprint': fingerprint_tree(tree),
+            'imports': tuple(sorted({module for module, _ in imports})),
+            'calls': tuple(sorted(call_names)),
+            'functions': tuple(
+                node.name for node in tree.body
+                if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef))
+            ),
+            'classes': tuple(node.name for node in tree.body if isinstance(node, ast.ClassDef)),
+            'top_level': tuple(type(node).__name__ for node in tree.body),
+            'forbidden': tuple(forbidden),
+            'warnings': tuple(warnings)
+        }
+
+
+def forbidden_message(forbidden: List[Dict]) -> str:
+    """Educational error for a submission rejected before running"""
+    lines = "\n".join(f"- {item['construct']} (line {item['line']})" for item in forbidden)
+    return f"""🚫 Your code uses something the grader doesn't allow
+
+{lines}
+
+💡 How to fix:
+- These modules and functions control processes or the system itself
+- None of the challenges need them - remove them and try again
+"""
@@ -0,0 +1,400 @@
+"""
+Grader Benchmark
+Offline throughput benchmark of TestRunner over the whole curriculum
+
+Every challenge from ChallengeLoader is graded with three kinds of
+submission:
+
+- reference: answers every test from a lookup table (the curriculum has no
+  model solutions), so nearly all the time is spent in the grader itself
+- wrong: returns a slightly wrong value for every test, exercising the
+  comparison and diagnostics of failing tests
+- pathological: infinite loops, output floods and runaway recursion on a
+  sample of challenges (infinite loops only when grading in the sandbox)
+
+Usage (from the project root):
+
+    python -m grader.benchmark                          # all modes, JSON on stdout
+    python -m grader.benchmark --modes parallel --workers 4 --output bench.json
+    python -m grader.benchmark --local                  # grade in-process
+
+Each mode runs in a fresh interpreter, so its peak RSS isn't inflated by
+the modes before it. A human-readable summary is printed to stderr.
+"""
+
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import subprocess
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, List
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+from .test_runner import TestRunner
+from .metrics import percentile
+
+KINDS = ('reference', 'wrong', 'pathological')
+
+# Pathological submissions, formatted with the name of each tested function
+PATHOLOGICAL = {
+    'infinite_loop': (
+        "def {name}(*args, **kwargs):\n"
+        "    while True:\n"
+        "        pass\n"
+    ),
+    'output_flood': (
+        "def {name}(*args, **kwargs):\n"
+        "    for i in range(100000):\n"
+        "        print('flood', i)\n"
+    ),
+    'runaway_recursion': (
+        "def {name}(*args, **kwargs):\n"
+        "    return {name}(*args, **kwargs)\n"
+    )
+}
+
+# Looks up the answer for the arguments a function was called with
+_LOOKUP_FUNCTION = (
+    "def {name}(*args, **kwargs):\n"
+    "    return _{name}_answers.get(repr((args, sorted(kwargs.items()))))\n"
+)
+
+
+def _answer_key(test_input) -> str:
+    """Lookup key for a test input, matching TestRunner._call_function"""
+    if isinstance(test_input, dict):
+        args, kwargs = (), test_input
+    elif isinstance(test_input, list):
+        args, kwargs = tuple(test_input), {}
+    elif test_input is None:
+        args, kwargs = (), {}
+    else:
+        args, kwargs = (test_input,), {}
+    return repr((args, sorted(kwargs.items())))
+
+
+def _perturb(value):
+    """A plausible but wrong version of an expected value"""
+    if isinstance(value, bool):
+        return not value
+    if isinstance(value, (int, float)):
+        return value + 1
+    if isinstance(value, str):
+        return value[::-1] + '!'
+    if isinstance(value, list):
+        return value[:-1] if value else [0]
+    if isinstance(value, dict):
+        return {}
+    if value is None:
+        return 0
+    return None
+
+
+def _function_names(tests: List[Dict]) -> List[str]:
+    names = []
+    for test in tests:
+        name = test.get('function')
+        if name and name not in names:
+            names.append(name)
+    return names
+
+
+def _lookup_submission(tests: List[Dict], answer) -> str:
+    """Code answering every test with answer(expected)"""
+    tables = {name: {} for name in _function_names(tests)}
+    for test in tests:
+        if test.get('function') and test.get('type') != 'complexity':
+            tables[test['function']][_answer_key(test.get('input'))] = answer(test.get('expected'))
+
+    lines = []
+    for name, table in tables.items():
+        lines.append(f"_{name}_answers = {table!r}\n")
+        lines.append(_LOOKUP_FUNCTION.format(name=name))
+    return '\n'.join(lines)
+
+
+def build_submissions(challenges: List[Dict], kinds=KINDS, pathological_sample: int = 4,
+                      sandbox: bool = True) -> List[Dict]:
+    """Submissions to grade: one dictionary per (challenge, kind, variant)"""
+    submissions = []
+    for challenge in challenges:
+        tests = challenge.get('tests', [])
+        if 'reference' in kinds:
+            submissions.append({
+                'challenge_id': challenge['id'], 'kind': 'reference', 'variant': 'lookup',
+                'code': _lookup_submission(tests, lambda expected: expected), 'tests': tests
+            })
+        if 'wrong' in kinds:
+            submissions.append({
+                'challenge_id': challenge['id'], 'kind': 'wrong', 'variant': 'perturbed',
+                'code': _lookup_submission(tests, _perturb), 'tests': tests
+            })
+
+    if 'pathological' in kinds and pathological_sample > 0:
+        # Evenly spread sample of challenges that test functions
+        candidates = [c for c in challenges if _function_names(c.get('tests', []))]
+        step = max(1, len(candidates) // pathological_sample)
+        for challenge in candidates[::step][:pathological_sample]:
+            tests = challenge.get('tests', [])
+            for variant, template in PATHOLOGICAL.items():
+                if variant == 'infinite_loop' and not sandbox:
+                    continue  # Nothing could stop it in-process
+                code = '\n'.join(template.format(name=name) for name in _function_names(tests))
+                submissions.append({
+                    'challenge_id': challenge['id'], 'kind': 'pathological', 'variant': variant,
+                    'code': code, 'tests': tests
+                })
+
+    return submissions
+
+
+def load_curriculum() -> List[Dict]:
+    """Every challenge, in curriculum order"""
+    from challenges.loader import ChallengeLoader
+
+    return ChallengeLoader().get_all_challenges()
+
+
+def _latency_summary(seconds: List[float]) -> Dict:
+    """Latency percentiles in milliseconds"""
+    ordered = sorted(seconds)
+    if not ordered:
+        return {}
+    summary = {f'p{pct}': round(percentile(ordered, pct) * 1000, 3) for pct in (50, 95, 99)}
+    summary['max'] = round(ordered[-1] * 1000, 3)
+    summary['mean'] = round(sum(ordered) / len(ordered) * 1000, 3)
+    return summary
+
+
+def _peak_rss_kb() -> Dict:
+    """Peak resident set size of this process and its finished children"""
+    if resource is None:
+        return {'benchmark': None, 'workers': None}
+    # ru_maxrss is in bytes on macOS and kilobytes elsewhere
+    scale = 1024 if sys.platform == 'darwin' else 1
+    return {
+        'benchmark': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss // scale,
+        'workers': resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss // scale
+    }
+
+
+def run_mode(mode: str, options: Dict) -> Dict:
+    """Grade every submission `options['repeat']` times in one grading mode"""
+    runner = TestRunner(
+        sandbox=not options['local'],
+        workers=options['workers'],
+        timeout=options['timeout']
+    )
+    submissions = build_submissions(
+        load_curriculum(), options['kinds'], options['pathological_sample'],
+        sandbox=not options['local']
+    )
+
+    concurrency = options['concurrency']
+    if concurrency is None:
+        # Like GradingQueue: one submission in flight per sandbox worker
+        concurrency = runner.pool.size if runner.pool is not None else 1
+
+    latencies = {kind: [] for kind in KINDS}
+    passed = {kind: 0 for kind in KINDS}
+    counts = {kind: 0 for kind in KINDS}
+    reference_failures = set()
+
+    def grade(submission):
+        start = time.perf_counter()
+        results = runner.run_tests(submission['code'], submission['tests'], mode=mode)
+        return submission, results, time.perf_counter() - start
+
+    try:
+        # Start the worker processes and import everything before timing
+        if submissions:
+            grade(submissions[0])
+
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as executor:
+            for _ in range(options['repeat']):
+                for submission, results, elapsed in executor.map(grade, submissions):
+                    kind = submission['kind']
+                    latencies[kind].append(elapsed)
+                    counts[kind] += 1
+                    if results['passed']:
+                        passed[kind] += 1
+                    elif kind == 'reference':
+                        reference_failures.add(submission['challenge_id'])
+        seconds = time.perf_counter() - start
+    finally:
+        if runner.pool is not None:
+            runner.pool.close()
+
+    total = sum(counts.values())
+    all_latencies = [value for kind in KINDS for value in latencies[kind]]
+    return {
+        'mode': mode,
+        'concurrency': concurrency,
+        'submissions': total,
+        'seconds': round(seconds, 3),
+        'submissions_per_sec': round(total / seconds, 2) if seconds > 0 else None,
+        'latency_ms': _latency_summary(all_latencies),
+        'kinds': {
+            kind: {
+                'submissions': counts[kind],
+                'passed': passed[kind],
+                'latency_ms': _latency_summary(latencies[kind])
+            }
+            for kind in KINDS if counts[kind]
+        },
+        'reference_failures': sorted(reference_failures),
+        'pool': dict(runner.pool.stats) if runner.pool is not None else None,
+        'peak_rss_kb': _peak_rss_kb()
+    }
+
+
+def _run_mode_child(conn, mode: str, options: Dict):
+    """Entry point of the fresh interpreter running one mode"""
+    try:
+        conn.send(('ok', run_mode(mode, options)))
+    except BaseException as e:
+        conn.send(('error', f"{type(e).__name__}: {e}"))
+    finally:
+        conn.close()
+
+
+def run_mode_isolated(mode: str, options: Dict) -> Dict:
+    """run_mode in a newly spawned interpreter, so peak RSS is per mode"""
+    context = multiprocessing.get_context('spawn')
+    parent_conn, child_conn = context.Pipe(duplex=False)
+    process = context.Process(target=_run_mode_child, args=(child_conn, mode, options))
+    process.start()
+    child_conn.close()
+    try:
+        status, payload = parent_conn.recv()
+    except EOFError:
+        status, payload = 'error', f"Benchmark process exited with code {process.exitcode}"
+    process.join()
+
+    if status != 'ok':
+        raise RuntimeError(f"Benchmark of mode '{mode}' failed: {payload}")
+    return payload
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=Path(__file__).parent, capture_output=True, text=True, timeout=5
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def _print_summary(report: Dict):
+    """Readable table of the main numbers on stderr"""
+    print(f"\n📊 Grader benchmark - {report['challenges']} challenges, "
+          f"{report['tests']} tests, commit {report['commit'] or 'unknown'}", file=sys.stderr)
+    print(f"{'mode':<12}{'subs/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+          f"{'RSS MB':>9}{'workers MB':>12}", file=sys.stderr)
+    for mode, result in report['modes'].items():
+        latency = result['latency_ms']
+        rss = result['peak_rss_kb']
+        to_mb = lambda kb: f"{kb / 1024:.1f}" if kb is not None else '-'
+        print(f"{mode:<12}{result['submissions_per_sec']:>10}{latency.get('p50', '-'):>10}"
+              f"{latency.get('p95', '-'):>10}{latency.get('p99', '-'):>10}"
+              f"{to_mb(rss['benchmark']):>9}{to_mb(rss['workers']):>12}", file=sys.stderr)
+
+    failures = set()
+    for result in report['modes'].values():
+        failures.update(result['reference_failures'])
+    if failures:
+        print(f"\n⚠️  Reference submissions failed for {len(failures)} challenge(s) "
+              f"(tests the grader doesn't support): {', '.join(sorted(failures))}", file=sys.stderr)
+
+
+def main(argv: List[str] = None):
+    parser = argparse.ArgumentParser(
+        prog='python -m grader.benchmark',
+        description='Offline grader throughput benchmark over the whole curriculum'
+    )
+    parser.add_argument('--modes', default=','.join(TestRunner.MODES),
+                        help='comma-separated grading modes (default: all)')
+    parser.add_argument('--kinds', default=','.join(KINDS),
+                        help='comma-separated submission kinds (default: all)')
+    parser.add_argument('--local', action='store_true',
+                        help='grade in-process instead of in sandbox workers')
+    parser.add_argument('--workers', type=int, default=None,
+                        help='sandbox worker processes (default: CPU count)')
+    parser.add_argument('--concurrency', type=int, default=None,
+                        help='submissions graded at once (default: one per worker)')
+    parser.add_argument('--timeout', type=float, default=1.0,
+                        help='per-submission time limit in seconds (default: 1)')
+    parser.add_argument('--repeat', type=int, default=3,
+                        help='times every submission is graded (default: 3)')
+    parser.add_argument('--pathological-sample', type=int, default=4,
+                        help='challenges given pathological submissions (default: 4)')
+    parser.add_argument('--no-isolate', action='store_true',
+                        help='run all modes in this process (peak RSS becomes cumulative)')
+    parser.add_argument('--output', help='write the JSON report here instead of stdout')
+    args = parser.parse_args(argv)
+
+    modes = [mode for mode in args.modes.split(',') if mode]
+    kinds = [kind for kind in args.kinds.split(',') if kind]
+    for mode in modes:
+        if mode not in TestRunner.MODES:
+            parser.error(f"unknown mode: {mode}")
+    for kind in kinds:
+        if kind not in KINDS:
+            parser.error(f"unknown submission kind: {kind}")
+
+    options = {
+        'local': args.local,
+        'workers': args.workers,
+        'concurrency': args.concurrency,
+        'timeout': args.timeout,
+        'repeat': args.repeat,
+        'kinds': kinds,
+        'pathological_sample': args.pathological_sample
+    }
+
+    challenges = load_curriculum()
+    report = {
+        'benchmark': 'grader',
+        'format_version': 1,
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': _git_commit(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'cpu_count': os.cpu_count(),
+        'options': options,
+        'challenges': len(challenges),
+        'tests': sum(len(c.get('tests', [])) for c in challenges),
+        'modes': {}
+    }
+
+    for mode in modes:
+        print(f"⏱️  Benchmarking {mode}...", file=sys.stderr)
+        if args.no_isolate:
+            report['modes'][mode] = run_mode(mode, options)
+        else:
+            report['modes'][mode] = run_mode_isolated(mode, options)
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        Path(args.output).write_text(output + '\n')
+        print(f"✅ Report written to {args.output}", file=sys.stderr)
+    else:
+        print(output)
+
+    _print_summary(report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""
+Result Cache
+Content-addressed LRU/TTL cache of grading results
+"""
+
+import hashlib
+import json
+import pickle
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional
+
+
+def hash_value(value) -> str:
+    """
+    Hash of a JSON-like value's content
+
+    Uses the C JSON encoder, falling back to an encoding without recursion
+    for values it can't take (nested too deeply, dict keys of mixed types).
+    The two never produce the same hash, so at worst a value that's hashed
+    both ways misses a cache once.
+
+    Raises:
+        ValueError: if the value contains itself
+    """
+    digest = hashlib.sha256()
+    try:
+        payload = json.dumps(value, sort_keys=True, default=repr, separators=(',', ':'))
+    except (RecursionError, TypeError, ValueError):
+        digest.update(b'\0walk\0')
+        _walk(digest.update, value)
+    else:
+        digest.update(payload.encode('utf-8', 'surrogatepass'))
+    return digest.hexdigest()
+
+
+class _Marker:
+    """Bytes to emit when popped from the walk stack (closing a container)"""
+
+    __slots__ = ('data', 'container_id')
+
+    def __init__(self, data: bytes, container_id: int = None):
+        self.data = data
+        self.container_id = container_id
+
+
+def _scalar_token(value) -> Optional[bytes]:
+    """Tagged encoding of a non-container value (None for containers)"""
+    if value is None:
+        return b'N'
+    if isinstance(value, bool):
+        return b'T' if value else b'F'
+    if isinstance(value, (list, tuple, dict)):
+        return None
+    if isinstance(value, str):
+        tag, text = b's', value
+    elif isinstance(value, int):
+        tag, text = b'i', repr(int(value))
+    elif isinstance(value, float):
+        tag, text = b'f', repr(float(value))
+    else:
+        tag, text = b'r', repr(value)
+    data = text.encode('utf-8', 'surrogatepass')
+    return b'%s%d:%s' % (tag, len(data), data)
+
+
+def _walk(update: Callable[[bytes], None], value):
+    """Pass a tagged encoding of `value` to `update`, using an explicit stack"""
+    stack = [value]
+    active = set()  # ids of the containers being walked, to catch cycles
+    while stack:
+        item = stack.pop()
+        if type(item) is _Marker:
+            update(item.data)
+            active.discard(item.container_id)
+            continue
+
+        token = _scalar_token(item)
+        if token is not None:
+            update(token)
+            continue
+
+        if id(item) in active:
+            raise ValueError("Circular reference detected")
+        active.add(id(item))
+
+        if isinstance(item, dict):
+            # Keys are hashable, so they can't hold dicts or lists; encode
+            # them up front to sort by
+            keyed = []
+            for key, child in item.items():
+                parts = []
+                _walk(parts.append, key)
+                keyed.append((b''.join(parts), child))
+            keyed.sort(key=lambda pair: pair[0])
+            update(b'{')
+            stack.append(_Marker(b'}', id(item)))
+            for key_data, child in reversed(keyed):
+                stack.append(child)
+                stack.append(_Marker(key_data))
+        else:
+            update(b'[' if isinstance(item, list) else b'(')
+            stack.append(_Marker(b']' if isinstance(item, list) else b')', id(item)))
+            stack.extend(reversed(item))
+
+
+def hash_tests(test_cases: List[Dict]) -> str:
+    """Hash a test suite so edited tests never hit stale results"""
+    return hash_value(test_cases)
+
+
+class ResultCache:
+    """Thread-safe LRU cache of grading results bounded by size and age"""
+
+    def __init__(self, max_bytes: int = 32 * 1024 * 1024, ttl: float = 3600):
+        self.max_bytes = max_bytes
+        self.ttl = ttl  # seconds, None = never expire
+
+        # key -> (stored_at, pickled results, source); stored pickled so
+        # cached results are immutable and their size is known exactly
+        self._entries = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._by_label = {}  # label (challenge id) -> [hits, misses]
+
+    @staticmethod
+    def make_key(source_fingerprint: str, test_cases: List[Dict], variant: str = '') -> Optional[str]:
+        """
+        Key for a submission (see grader.fingerprint) against a test suite
+
+        `variant` separates gradings that produce different results for the
+        same code and tests, e.g. fail-fast mode. Returns None for tests that
+        can't be hashed (they contain themselves) - grade without caching.
+        """
+        try:
+            tests_hash = hash_tests(test_cases)
+        except (RecursionError, ValueError):
+            return None
+        return f"{source_fingerprint}:{tests_hash}:{variant}"
+
+    def get(self, key: str, label: str = None, source: str = None) -> Optional[Dict]:
+        """
+        Return a fresh copy of the cached results, or None
+
+        `label` (usually the challenge id) groups hits and misses in stats().
+        Results stored for one exact `source` (see put()) only hit for it.
+        """
+        with self._lock:
+            counts = self._by_label.setdefault(label, [0, 0]) if label else None
+
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, payload, entry_source = entry
+                if self.ttl is not None and time.monotonic() - stored_at > self.ttl:
+                    self._remove(key)
+                    entry = None
+                elif entry_source is not None and entry_source != source:
+                    entry = None
+
+            if entry is None:
+                self.misses += 1
+                if counts is not None:
+                    counts[1] += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self.hits += 1
+            if counts is not None:
+                counts[0] += 1
+
+        return pickle.loads(payload)
+
+    def put(self, key: str, results: Dict, source: str = None):
+        """
+        Store results, evicting least recently used entries to fit
+
+        Pass `source` (e.g. a hash of the exact code) for results that
+        only hold for that code, like tracebacks with its line numbers.
+        """
+        try:
+            payload = pickle.dumps(results, protocol=pickle.HIGHEST_PROTOCOL)
+        except Exception:
+            return  # Results hold objects that can't be stored
+
+        if len(payload) > self.max_bytes:
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic(), payload, source)
+            self._bytes += len(payload)
+
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def clear(self):
+        """Drop all cached results"""
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def _remove(self, key: str):
+        """Remove an entry (caller holds the lock)"""
+        _, payload, _ = self._entries.pop(key)
+        self._bytes -= len(payload)
+
+    def stats(self) -> Dict:
+        """Hit/miss counts and memory use"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 3) if lookups else 0,
+                'entries': len(self._entries),
+                'bytes': self._bytes,
+                'max_bytes': self.max_bytes,
+                'evictions': self.evictions,
+                'by_challenge': {
+                    label: {
+                        'hits': hits,
+                        'misses': misses,
+                        'hit_rate': round(hits / (hits + misses), 3)
+                    }
+                    for label, (hits, misses) in self._by_label.items()
+                }
+            }
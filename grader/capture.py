@@ -0,0 +1,123 @@
+"""
+Output Capture
+Per-execution stdout capture that is safe to use from many threads at once
+"""
+
+import contextvars
+import io
+import sys
+import threading
+from contextlib import contextmanager
+
+# Buffer receiving output for the current thread / context (None = real stdout)
+_current_buffer = contextvars.ContextVar('grader_output_buffer', default=None)
+_install_lock = threading.Lock()
+
+
+class _StdoutRouter:
+    """
+    Stand-in for sys.stdout that sends writes to the buffer of whichever
+    execution context is writing, and everything else to the real stream.
+    """
+
+    def __init__(self, stream):
+        self._stream = stream
+
+    def _target(self):
+        buffer = _current_buffer.get()
+        return self._stream if buffer is None else buffer
+
+    def write(self, text):
+        return self._target().write(text)
+
+    def writelines(self, lines):
+        return self._target().writelines(lines)
+
+    def flush(self):
+        return self._target().flush()
+
+    def __getattr__(self, name):
+        # encoding, fileno, isatty, ... come from the real stream
+        return getattr(self._stream, name)
+
+
+def _install_router():
+    """Route sys.stdout through a _StdoutRouter (once, or again if replaced)"""
+    if isinstance(sys.stdout, _StdoutRouter):
+        return
+    with _install_lock:
+        if not isinstance(sys.stdout, _StdoutRouter):
+            sys.stdout = _StdoutRouter(sys.stdout)
+
+
+class CappedBuffer:
+    """
+    Text buffer that stops storing output after `max_bytes` (UTF-8).
+
+    Further writes are counted but dropped, and getvalue() ends with a
+    truncation marker, so a print inside a huge loop can't exhaust memory.
+    """
+
+    def __init__(self, max_bytes: int = 64 * 1024):
+        self.max_bytes = max_bytes
+        self._parts = []
+        self._size = 0
+        self.dropped_bytes = 0
+
+    @property
+    def truncated(self) -> bool:
+        return self.dropped_bytes > 0
+
+    def write(self, text: str) -> int:
+        if self._size >= self.max_bytes:
+            self.dropped_bytes += len(text)
+            return len(text)
+
+        data = text.encode('utf-8', 'replace')
+        room = self.max_bytes - self._size
+        if len(data) > room:
+            self.dropped_bytes += len(data) - room
+            data = data[:room]
+        self._parts.append(data)
+        self._size += len(data)
+        return len(text)
+
+    def writelines(self, lines):
+        for line in lines:
+            self.write(line)
+
+    def copy(self) -> 'CappedBuffer':
+        """A buffer holding the same output, to continue writing to under the same limit"""
+        buffer = CappedBuffer(self.max_bytes)
+        buffer._parts = list(self._parts)
+        buffer._size = self._size
+        buffer.dropped_bytes = self.dropped_bytes
+        return buffer
+
+    def flush(self):
+        pass
+
+    def getvalue(self) -> str:
+        value = b''.join(self._parts).decode('utf-8', 'ignore')
+        if self.truncated:
+            value += f"\n... [output truncated after {self.max_bytes} bytes]\n"
+        return value
+
+
+@contextmanager
+def capture_output(buffer=None):
+    """
+    Capture everything printed in this execution context.
+
+    Unlike swapping sys.stdout, concurrent captures in other threads never
+    see each other's output. Threads started by user code don't inherit the
+    context, so their output goes to the real stdout.
+    """
+    if buffer is None:
+        buffer = io.StringIO()
+    _install_router()
+    token = _current_buffer.set(buffer)
+    try:
+        yield buffer
+    finally:
+        _current_buffer.reset(token)
@@ -0,0 +1,275 @@
+"""
+Comparators
+Expected values compiled once into plans that check results quickly
+
+A Comparator gives the same answers as the original recursive
+_compare_values: numbers match within 0.01, strings match after stripping,
+lists/tuples/dicts must have the same type and shape. But:
+
+- the plan is built once per expected value and reused
+- lists and dicts of plain values are checked with one C-level == plus a
+  type check, falling back to element-by-element only when that fails
+- nested structures are walked with an explicit stack, so depth is not
+  limited by Python's recursion limit
+- the issue code is only worked out (diagnose) when the value didn't match
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional
+
+from .cache import hash_value
+
+# Node kinds
+_NONE, _NUMBER, _STR, _OTHER, _SEQ, _DICT = range(6)
+
+_NUMERIC_TYPES = frozenset({int, float, bool})
+
+# For each plain expected type, the actual types that match it whenever the
+# two compare equal (an equal value of any other type is a type mismatch)
+_PLAIN_TYPES = {
+    type(None): frozenset({type(None)}),
+    bool: _NUMERIC_TYPES,
+    int: _NUMERIC_TYPES,
+    float: _NUMERIC_TYPES,
+    str: frozenset({str})
+}
+
+
+def _fast_types(values) -> Optional[frozenset]:
+    """Actual types allowed for a container of plain values (None if not plain)"""
+    allowed = frozenset()
+    for expected_type in set(map(type, values)):
+        types = _PLAIN_TYPES.get(expected_type)
+        if types is None:
+            return None
+        allowed |= types
+    return allowed
+
+
+class _Node:
+    """One expected value in a plan; children are compiled on first use"""
+
+    __slots__ = ('kind', 'expected', 'type', 'is_float', 'stripped', 'fast_types', '_children')
+
+    def __init__(self, expected):
+        self.expected = expected
+        self.type = type(expected)
+        self.is_float = isinstance(expected, float)
+        self.stripped = None
+        self.fast_types = None
+        self._children = None
+
+        if expected is None:
+            self.kind = _NONE
+        elif isinstance(expected, str):
+            self.kind = _STR
+            self.stripped = expected.strip()
+        elif isinstance(expected, (int, float)):
+            self.kind = _NUMBER
+        elif isinstance(expected, (list, tuple)):
+            self.kind = _SEQ
+            self.fast_types = _fast_types(expected)
+        elif isinstance(expected, dict):
+            self.kind = _DICT
+            self.fast_types = _fast_types(expected.values())
+        else:
+            self.kind = _OTHER
+
+    @property
+    def children(self):
+        """Child nodes: a list for sequences, (key, node) pairs for dicts"""
+        if self._children is None:
+            if self.kind == _SEQ:
+                self._children = [_Node(value) for value in self.expected]
+            else:
+                self._children = [(key, _Node(value)) for key, value in self.expected.items()]
+        return self._children
+
+
+def _leaf_matches(node: _Node, actual) -> bool:
+    """Match a non-container expected value"""
+    kind = node.kind
+    if kind == _NONE:
+        return actual is None
+    if actual is None:
+        return False
+
+    if type(actual) is not node.type:
+        # Allow int/float flexibility
+        if kind == _NUMBER and isinstance(actual, (int, float)):
+            return abs(actual - node.expected) < 0.01
+        return False
+
+    if kind == _STR:
+        return actual.strip() == node.stripped or actual == node.expected
+    if node.is_float:
+        return abs(actual - node.expected) < 0.01
+    return actual == node.expected
+
+
+def _node_matches(root: _Node, actual) -> bool:
+    """Match any expected value, walking containers without recursion"""
+    if root.kind < _SEQ:
+        return _leaf_matches(root, actual)
+
+    stack = [(root, actual)]
+    while stack:
+        node, actual = stack.pop()
+        if type(actual) is not node.type:
+            return False
+        if len(actual) != len(node.expected):
+            return False
+
+        if node.kind == _SEQ:
+            values = actual
+        else:
+            if actual.keys() != node.expected.keys():
+                return False
+            values = actual.values()
+
+        # Fast path: one == for the whole container of plain values
+        if node.fast_types is not None:
+            try:
+                if actual == node.expected and set(map(type, values)) <= node.fast_types:
+                    continue
+            except Exception:
+                pass
+
+        if node.kind == _SEQ:
+            pairs = zip(node.children, actual)
+        else:
+            pairs = ((child, actual.get(key)) for key, child in node.children)
+
+        for child, value in pairs:
+            if child.kind >= _SEQ:
+                if value is None:
+                    return False
+                stack.append((child, value))
+            elif not _leaf_matches(child, value):
+                return False
+
+    return True
+
+
+class Comparator:
+    """A compiled expected value"""
+
+    def __init__(self, expected):
+        self.expected = expected
+        self._root = _Node(expected)
+
+    def matches(self, actual) -> bool:
+        """True if `actual` is an acceptable result"""
+        return _node_matches(self._root, actual)
+
+    def diagnose(self, actual) -> Optional[str]:
+        """Issue code describing why `actual` doesn't match (None if it does)"""
+        root = self._root
+        expected = self.expected
+
+        if root.kind == _NONE:
+            return None if actual is None else 'none_mismatch'
+        if actual is None:
+            return 'none_mismatch'
+
+        if type(actual) is not root.type:
+            if root.kind == _NUMBER and isinstance(actual, (int, float)):
+                return None if abs(actual - expected) < 0.01 else 'number_mismatch'
+            return 'type_mismatch'
+
+        if root.kind == _STR:
+            return None if _leaf_matches(root, actual) else 'string_mismatch'
+        if root.is_float:
+            return None if _leaf_matches(root, actual) else 'float_precision'
+
+        if root.kind == _SEQ:
+            if len(actual) != len(expected):
+                return 'length_mismatch'
+            for i, (child, value) in enumerate(zip(root.children, actual)):
+                if not _node_matches(child, value):
+                    return f'element_{i}_mismatch'
+            return None
+
+        if root.kind == _DICT:
+            if set(actual.keys()) != set(expected.keys()):
+                return 'dict_keys_mismatch'
+            for key, child in root.children:
+                if not _node_matches(child, actual.get(key)):
+                    return f'dict_value_{key}_mismatch'
+            return None
+
+        return None if actual == expected else 'value_mismatch'
+
+    def compare(self, actual) -> Dict:
+        """Result in the {'match': ..., 'issue': ...} form"""
+        if self.matches(actual):
+            return {'match': True, 'issue': None}
+        return {'match': False, 'issue': self.diagnose(actual) or 'value_mismatch'}
+
+
+def _same_value(a, b) -> bool:
+    try:
+        return a is b or bool(a == b)
+    except Exception:
+        return False
+
+
+class ComparatorCache:
+    """
+    Comparators keyed by the content of the expected value
+
+    Keyed by content rather than identity, so sandbox workers, which receive
+    unpickled copies of the test cases with every job, reuse one plan per
+    expected value too. A hit is only used if the compiled value equals the
+    expected one (JSON doesn't tell lists from tuples); values that contain
+    themselves are compiled every time.
+
+    The test cases held by ChallengeLoader are looked up by identity first,
+    so in-process grading doesn't hash large expected values every time.
+    """
+
+    def __init__(self, max_entries: int = 4096):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # content hash -> comparator
+        self._by_id = {}               # id of a compiled expected value -> content hash
+        self._lock = threading.Lock()
+
+    def get(self, expected) -> Comparator:
+        """Comparator for `expected`, compiling it on first use"""
+        with self._lock:
+            # The comparator keeps its expected value alive, so the id
+            # can't have been reused while the entry exists
+            key = self._by_id.get(id(expected))
+            comparator = self._entries.get(key) if key is not None else None
+            if comparator is not None and comparator.expected is expected:
+                self._entries.move_to_end(key)
+                return comparator
+
+        try:
+            key = hash_value(expected)
+        except ValueError:
+            return Comparator(expected)  # Contains itself
+
+        with self._lock:
+            comparator = self._entries.get(key)
+            if comparator is not None and _same_value(comparator.expected, expected):
+                self._entries.move_to_end(key)
+                return comparator
+
+        comparator = Comparator(expected)
+        with self._lock:
+            self._store(key, comparator)
+        return comparator
+
+    def _store(self, key: str, comparator: Comparator):
+        """Add a comparator, evicting the least recently used (caller holds the lock)"""
+        replaced = self._entries.pop(key, None)
+        if replaced is not None:
+            self._by_id.pop(id(replaced.expected), None)
+        self._entries[key] = comparator
+        self._by_id[id(comparator.expected)] = key
+
+        while len(self._entries) > self.max_entries:
+            _, evicted = self._entries.popitem(last=False)
+            self._by_id.pop(id(evicted.expected), None)
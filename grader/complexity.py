@@ -0,0 +1,201 @@
+"""
+Complexity Tests
+Time a function over growing inputs and estimate how its runtime scales
+
+A complexity test case in challenge YAML looks like:
+
+    - function: find_max
+      type: complexity
+      generator: int_list         # how to build the input for size n
+      sizes: [1000, 2000, 4000, 8000, 16000]
+      max_complexity: "O(n)"
+      time_budget: 0.5            # optional, seconds at the largest size
+
+If one call gets slower than `cutoff` seconds the larger sizes are
+skipped and the curve is fitted on what was measured.
+"""
+
+import gc
+import math
+import random
+import string
+import time
+from typing import Callable, Dict, List
+
+# Growth exponent k of n**k that each complexity class roughly shows when
+# timed over a few doublings of n
+COMPLEXITY_EXPONENTS = {
+    'O(1)': 0.0,
+    'O(log n)': 0.15,
+    'O(n)': 1.0,
+    'O(n log n)': 1.15,
+    'O(n^2)': 2.0,
+    'O(n^3)': 3.0
+}
+
+DEFAULT_SIZES = [1000, 2000, 4000, 8000, 16000]
+DEFAULT_REPEAT = 5
+DEFAULT_TOLERANCE = 0.5
+
+# Seconds a single call may take before larger sizes are skipped
+DEFAULT_CUTOFF = 0.5
+
+# Shortest time a single measurement should take before it is trusted
+_MIN_MEASURE_SECONDS = 0.002
+
+
+def _int_list(rng: random.Random, n: int) -> List:
+    return [[rng.randint(-10 ** 6, 10 ** 6) for _ in range(n)]]
+
+
+def _sorted_int_list(rng: random.Random, n: int) -> List:
+    return [sorted(_int_list(rng, n)[0])]
+
+
+def _string(rng: random.Random, n: int) -> List:
+    return [''.join(rng.choice(string.ascii_lowercase) for _ in range(n))]
+
+
+def _word_list(rng: random.Random, n: int) -> List:
+    return [[_string(rng, rng.randint(3, 8))[0] for _ in range(n)]]
+
+
+# Generators return the test input for size n, in the usual test input
+# format (a list is passed as positional arguments)
+GENERATORS = {
+    'int': lambda rng, n: n,
+    'int_list': _int_list,
+    'sorted_int_list': _sorted_int_list,
+    'string': _string,
+    'word_list': _word_list
+}
+
+
+def _fresh_input(test_input):
+    """
+    Copy of a generated input, so a function that mutates its argument
+    (e.g. sorts it in place) gets the same input on every call. Generated
+    inputs are at most a list of flat lists, so two levels are enough.
+    """
+    if isinstance(test_input, list):
+        return [arg[:] if isinstance(arg, list) else arg for arg in test_input]
+    return test_input
+
+
+def _time_calls(call: Callable, test_input, repeat: int, cutoff: float) -> float:
+    """
+    Best time of up to `repeat` measurements of one call, in seconds
+
+    Repeats stop once `cutoff` seconds have been spent, so slow solutions
+    still finish well inside the grading timeout.
+    """
+    gc_was_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        # Batch several calls per measurement when a single one is too fast
+        # for the clock to time reliably
+        number = 1
+        while True:
+            inputs = [_fresh_input(test_input) for _ in range(number)]
+            start = time.perf_counter()
+            for args in inputs:
+                call(args)
+            elapsed = time.perf_counter() - start
+            if elapsed >= _MIN_MEASURE_SECONDS or number >= 1000:
+                break
+            number *= 10
+
+        best = spent = elapsed
+        for _ in range(repeat - 1):
+            if spent + best > cutoff:
+                break
+            inputs = [_fresh_input(test_input) for _ in range(number)]
+            start = time.perf_counter()
+            for args in inputs:
+                call(args)
+            elapsed = time.perf_counter() - start
+            best = min(best, elapsed)
+            spent += elapsed
+        return best / number
+    finally:
+        if gc_was_enabled:
+            gc.enable()
+
+
+def fit_exponent(sizes: List[int], seconds: List[float]) -> float:
+    """Least-squares slope of log(time) against log(n)"""
+    xs = [math.log(n) for n in sizes]
+    ys = [math.log(max(t, 1e-9)) for t in seconds]
+    mean_x = sum(xs) / len(xs)
+    mean_y = sum(ys) / len(ys)
+    spread = sum((x - mean_x) ** 2 for x in xs)
+    if spread == 0:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / spread
+
+
+def classify(exponent: float) -> str:
+    """Complexity class whose exponent is closest to the measured one"""
+    return min(COMPLEXITY_EXPONENTS, key=lambda name: abs(COMPLEXITY_EXPONENTS[name] - exponent))
+
+
+def measure_scaling(call: Callable, test_case: Dict) -> Dict:
+    """
+    Time `call(test_input)` for each size of a complexity test case
+
+    Returns a dictionary with the measured timings, the fitted growth
+    exponent, the closest complexity class and whether the declared
+    complexity and time budget were met.
+
+    Raises:
+        ValueError: if the test case is malformed
+    """
+    generator_name = test_case.get('generator', 'int_list')
+    if generator_name not in GENERATORS:
+        raise ValueError(f"Unknown input generator: {generator_name}")
+
+    max_complexity = test_case.get('max_complexity', 'O(n)')
+    if max_complexity not in COMPLEXITY_EXPONENTS:
+        raise ValueError(f"Unknown complexity class: {max_complexity}")
+
+    sizes = sorted(test_case.get('sizes', DEFAULT_SIZES))
+    if len(sizes) < 2:
+        raise ValueError("Complexity tests need at least two input sizes")
+
+    repeat = test_case.get('repeat', DEFAULT_REPEAT)
+    tolerance = test_case.get('tolerance', DEFAULT_TOLERANCE)
+    time_budget = test_case.get('time_budget')
+    cutoff = test_case.get('cutoff', DEFAULT_CUTOFF if time_budget is None else time_budget)
+
+    # Same inputs every run so timings are comparable between submissions
+    rng = random.Random(test_case.get('seed', 0))
+    generator = GENERATORS[generator_name]
+
+    timings = []
+    for n in sizes:
+        timings.append(_time_calls(call, generator(rng, n), repeat, cutoff))
+        if timings[-1] > cutoff:
+            break
+
+    measured_sizes = sizes[:len(timings)]
+    stopped_early = len(timings) < len(sizes)
+    if len(timings) >= 2:
+        exponent = fit_exponent(measured_sizes, timings)
+    else:
+        # Too slow even at the smallest size - nothing to fit
+        exponent = float('inf')
+
+    within_complexity = exponent <= COMPLEXITY_EXPONENTS[max_complexity] + tolerance
+    within_budget = time_budget is None or (not stopped_early and timings[-1] <= time_budget)
+
+    return {
+        'timings': [{'size': n, 'seconds': t} for n, t in zip(measured_sizes, timings)],
+        'stopped_early': stopped_early,
+        'exponent': round(exponent, 2) if math.isfinite(exponent) else None,
+        'estimated_complexity': classify(exponent) if math.isfinite(exponent) else None,
+        'max_complexity': max_complexity,
+        'time_budget': time_budget,
+        'within_complexity': within_complexity,
+        'within_budget': within_budget,
+        'passed': within_complexity and within_budget
+    }
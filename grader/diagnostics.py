@@ -0,0 +1,460 @@
+"""
+Diagnostics
+Compact descriptions of failed tests, rendered into full messages on request
+
+Grading only records a small diagnostic per failing test: an issue code
+plus bounded previews of the values involved (never the full repr of a huge
+list). summarize() turns it into a one-line error, render() into the full
+educational message, which is cached since the same mistakes come up over
+and over again.
+"""
+
+import json
+import reprlib
+from functools import lru_cache
+from itertools import islice
+from typing import Dict, List, Tuple
+
+# Longest text preview of a value, in characters
+PREVIEW_CHARS = 80
+
+# Longest preview of a test's expected / actual value (roomier, since the
+# page shows them in full when they fit)
+VALUE_PREVIEW_CHARS = 1000
+
+# Most keys, and list items, kept from a client-supplied diagnostic
+MAX_DIAGNOSTIC_ITEMS = 20
+
+
+class _BoundedRepr(reprlib.Repr):
+    """
+    reprlib.Repr that records whether it left anything out
+
+    One instance per repr() call: `truncated` is set by the same conditions
+    reprlib uses to shorten a part, so it doesn't matter what the text says.
+    """
+
+    def __init__(self, max_items: int, max_chars: int, max_level: int):
+        super().__init__()
+        self.maxlevel = max_level
+        self.maxlist = self.maxtuple = self.maxset = self.maxfrozenset = max_items
+        self.maxdict = self.maxdeque = self.maxarray = max_items
+        self.maxstring = self.maxlong = self.maxother = max_chars
+        self.truncated = False
+
+    def _repr_iterable(self, x, level, left, right, maxiter, trail=''):
+        if len(x) > maxiter or (level <= 0 and len(x)):
+            self.truncated = True
+        return super()._repr_iterable(x, level, left, right, maxiter, trail)
+
+    def repr_dict(self, x, level):
+        if len(x) > self.maxdict or (level <= 0 and len(x)):
+            self.truncated = True
+        return super().repr_dict(x, level)
+
+    def repr_str(self, x, level):
+        if len(repr(x[:self.maxstring])) > self.maxstring:
+            self.truncated = True
+        return super().repr_str(x, level)
+
+    def repr_int(self, x, level):
+        try:
+            text = repr(x)
+        except ValueError:
+            # More digits than int -> str conversion allows
+            self.truncated = True
+            return f'<int with {x.bit_length()} bits>'
+        if len(text) > self.maxlong:
+            self.truncated = True
+        return super().repr_int(x, level)
+
+    def repr_instance(self, x, level):
+        try:
+            text = repr(x)
+        except Exception:
+            self.truncated = True  # reprlib makes up a placeholder
+        else:
+            if len(text) > self.maxother:
+                self.truncated = True
+        return super().repr_instance(x, level)
+
+
+def _bounded_text(value, max_items: int, max_chars: int, max_level: int) -> Tuple[str, bool]:
+    """Bounded text for a value and whether it was shortened"""
+    if isinstance(value, str):
+        text, truncated = value, False
+    else:
+        r = _BoundedRepr(max_items, max_chars, max_level)
+        text = r.repr(value)
+        truncated = r.truncated
+    if len(text) > max_chars:
+        text, truncated = text[:max_chars - 3] + '...', True
+    return text, truncated
+
+
+def preview(value) -> str:
+    """Bounded text for a value: strings as-is, everything else as a repr"""
+    return _bounded_text(value, 8, PREVIEW_CHARS, 3)[0]
+
+
+def preview_value(value):
+    """
+    A test's expected or actual value, bounded for the response
+
+    Values whose preview shows all of them are kept as they are (so they
+    are still sent as JSON); larger ones become their preview text.
+    """
+    if value is None or isinstance(value, (bool, float)):
+        return value
+    text, truncated = _bounded_text(value, 100, VALUE_PREVIEW_CHARS, 6)
+    if isinstance(value, (int, list, tuple, dict)) and not truncated:
+        return value
+    return text
+
+
+def diagnose_mismatch(issue: str, expected, actual, function_name: str, test_input) -> Dict:
+    """Diagnostic for a function that returned the wrong value"""
+    diagnostic = {
+        'code': issue,
+        'function': function_name,
+        'expected': preview(expected),
+        'actual': preview(actual),
+        'expected_type': type(expected).__name__,
+        'actual_type': type(actual).__name__
+    }
+
+    if issue == 'string_mismatch':
+        diagnostic['expected_length'] = len(str(expected))
+        diagnostic['actual_length'] = len(str(actual))
+    elif issue in ('number_mismatch', 'float_precision'):
+        difference = abs(actual - expected)
+        # Keep it JSON-friendly even for int/float subclasses
+        diagnostic['difference'] = difference if type(difference) in (int, float) else preview(difference)
+    elif issue == 'length_mismatch':
+        diagnostic['expected_length'] = len(expected)
+        diagnostic['actual_length'] = len(actual)
+    elif issue == 'dict_keys_mismatch':
+        missing = set(expected.keys()) - set(actual.keys())
+        extra = set(actual.keys()) - set(expected.keys())
+        diagnostic['missing_keys'] = preview(list(missing)) if missing else None
+        diagnostic['extra_keys'] = preview(list(extra)) if extra else None
+        diagnostic['expected_keys'] = preview(list(expected.keys()))
+    else:
+        diagnostic['input'] = preview(test_input)
+
+    return diagnostic
+
+
+def diagnose_missing_function(function_name: str, user_code: str, namespace: Dict) -> Dict:
+    """Diagnostic for a test whose function isn't defined by the submission"""
+    defined = [name for name in namespace if callable(namespace.get(name)) and not name.startswith('_')]
+    return {
+        'code': 'function_not_found',
+        'function': function_name,
+        'defined_functions': defined[:10],
+        'has_def': 'def ' in user_code,
+        'has_function_name': function_name in user_code,
+        'def_count': len(user_code.split('def')) - 1
+    }
+
+
+def diagnose_complexity(scaling: Dict) -> Dict:
+    """Diagnostic for a failed complexity test"""
+    return {
+        'code': 'too_slow' if scaling['within_complexity'] else 'complexity_mismatch',
+        'max_complexity': scaling['max_complexity'],
+        'estimated_complexity': scaling['estimated_complexity'],
+        'time_budget': scaling['time_budget'],
+        'stopped_early': scaling['stopped_early'],
+        'timings': [[t['size'], t['seconds']] for t in scaling['timings']]
+    }
+
+
+def summarize(diagnostic: Dict) -> str:
+    """One-line error for a diagnostic"""
+    code = diagnostic.get('code')
+    d = diagnostic
+
+    if code == 'type_mismatch':
+        return f"❌ Wrong Data Type: expected {d['expected_type']}, got {d['actual_type']}"
+    elif code == 'string_mismatch':
+        if d['expected_length'] != d['actual_length']:
+            return f"❌ String Doesn't Match: expected {d['expected_length']} characters, got {d['actual_length']}"
+        return "❌ String Doesn't Match: check spelling, spacing and punctuation"
+    elif code in ('number_mismatch', 'float_precision'):
+        return f"❌ Number Doesn't Match: off by {d['difference']}"
+    elif code == 'length_mismatch':
+        return f"❌ Wrong Number of Items: expected {d['expected_length']}, got {d['actual_length']}"
+    elif code == 'dict_keys_mismatch':
+        parts = []
+        if d.get('missing_keys'):
+            parts.append(f"missing {d['missing_keys']}")
+        if d.get('extra_keys'):
+            parts.append(f"extra {d['extra_keys']}")
+        return "❌ Dictionary Keys Don't Match: " + ', '.join(parts)
+    elif code == 'none_mismatch':
+        if d['actual_type'] == 'NoneType':
+            return "❌ Function Returned Nothing (None) - did you forget to return?"
+        return "❌ Function Returned Something Unexpected - this test expects None"
+    elif code == 'function_not_found':
+        return f"❌ Function '{d['function']}' Not Found"
+    elif code == 'complexity_mismatch':
+        grows_like = d['estimated_complexity'] or 'too slow to measure'
+        return f"❌ Solution Doesn't Scale Well Enough: allowed {d['max_complexity']}, yours grows like {grows_like}"
+    elif code == 'too_slow':
+        return f"❌ Solution Is Too Slow: over the {d['time_budget']}s time budget"
+    elif code and code.startswith('element_'):
+        return f"❌ Output Doesn't Match: first difference at index {code.split('_')[1]}"
+    elif code and code.startswith('dict_value_'):
+        return f"❌ Output Doesn't Match: wrong value for key {preview(code[len('dict_value_'):-len('_mismatch')])}"
+    return "❌ Output Doesn't Match"
+
+
+def render(diagnostic: Dict) -> str:
+    """
+    Full educational message for a diagnostic
+
+    Raises:
+        ValueError: if the diagnostic is malformed
+    """
+    # Diagnostics may come back from clients, so bound them again
+    bounded = {
+        preview(key): _bound_field(value)
+        for key, value in islice(diagnostic.items(), MAX_DIAGNOSTIC_ITEMS)
+    }
+    try:
+        return _render_cached(json.dumps(bounded, sort_keys=True))
+    except (KeyError, TypeError, ValueError, IndexError) as e:
+        raise ValueError(f"Invalid diagnostic: {e}")
+
+
+def _bound_field(value, depth: int = 0):
+    """A diagnostic field with strings previewed and lists (e.g. timings) capped"""
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, list) and depth < 2:
+        return [_bound_field(item, depth + 1) for item in value[:MAX_DIAGNOSTIC_ITEMS]]
+    return preview(value)
+
+
+@lru_cache(maxsize=1024)
+def _render_cached(key: str) -> str:
+    d = json.loads(key)
+    code = d.get('code')
+
+    if code == 'type_mismatch':
+        return f"""❌ Wrong Data Type
+
+Expected: {d['expected_type']} ({d['expected']})
+Got: {d['actual_type']} ({d['actual']})
+
+💡 How to fix:
+- If you need a number, remove quotes: 5 not "5"
+- If you need text, add quotes: "hello" not hello
+- Check your return statement returns the right type
+- Example: return 5 (number) vs return "5" (string)
+"""
+
+    elif code == 'string_mismatch':
+        # Show character-by-character difference
+        diff_hint = ""
+        if d['actual_length'] != d['expected_length']:
+            diff_hint = f"\n- Length: Expected {d['expected_length']}, got {d['actual_length']}"
+
+        return f"""❌ String Doesn't Match
+
+Expected: "{d['expected']}"
+Got: "{d['actual']}"{diff_hint}
+
+💡 How to fix:
+- Check spelling and capitalization carefully
+- Make sure punctuation matches exactly
+- Remove any extra spaces at start/end
+- Use f-strings for variables: f"Hello, {{name}}!"
+- Check quotes match: "text" or 'text' (be consistent)
+"""
+
+    elif code in ('number_mismatch', 'float_precision'):
+        return f"""❌ Number Doesn't Match
+
+Expected: {d['expected']}
+Got: {d['actual']}
+Difference: {d['difference']}
+
+💡 How to fix:
+- Check your math formula carefully
+- Common mistakes:
+  * Using + instead of *
+  * Forgetting parentheses: (a + b) * 2
+  * Integer division: use / not //
+- For rounding: round(result, 2) for 2 decimals
+- Print intermediate values to debug: print(f"Result is: {{result}}")
+"""
+
+    elif code == 'length_mismatch':
+        return f"""❌ List/Collection Has Wrong Number of Items
+
+Expected {d['expected_length']} items: {d['expected']}
+Got {d['actual_length']} items: {d['actual']}
+
+💡 How to fix:
+- Check your loop - are you adding all items?
+- Did you accidentally skip some? Check your 'if' conditions
+- Are you adding extra items by mistake?
+- Use print(my_list) before returning to see what you have
+"""
+
+    elif code == 'dict_keys_mismatch':
+        msg = "❌ Dictionary Keys Don't Match\n\n"
+        if d.get('missing_keys'):
+            msg += f"Missing keys: {d['missing_keys']}\n"
+        if d.get('extra_keys'):
+            msg += f"Extra keys: {d['extra_keys']}\n"
+        msg += f"\n💡 How to fix:\n"
+        msg += f"- Check key names for typos\n"
+        msg += f"- Make sure you're creating all required keys\n"
+        msg += f"- Should have exactly: {d['expected_keys']}\n"
+        msg += f"- Example: {{'key': 'value', 'key2': 'value2'}}\n"
+        return msg
+
+    elif code == 'none_mismatch':
+        if d['actual_type'] == 'NoneType':
+            return """❌ Function Returned Nothing (None)
+
+💡 How to fix:
+- Add a return statement: return result
+- Make sure return is not just 'pass'
+- Check indentation - return should be INSIDE the function
+- Don't just print, you must RETURN:
+
+  ❌ Wrong:
+  def add(a, b):
+      print(a + b)  # This prints but doesn't return!
+
+  ✅ Right:
+  def add(a, b):
+      return a + b  # This returns the value
+"""
+        return f"""❌ Function Returned Something Unexpected
+
+Expected: None (nothing)
+Got: {d['actual']}
+
+💡 This test expects the function to NOT return anything
+- Remove the return statement, or
+- Check if you're in the right test case
+"""
+
+    elif code == 'function_not_found':
+        return _render_function_not_found(d)
+
+    elif code in ('complexity_mismatch', 'too_slow'):
+        return _render_complexity(d)
+
+    # Generic helpful error with debugging steps
+    return f"""❌ Output Doesn't Match
+
+Expected: {d['expected']}
+Got: {d['actual']}
+
+💡 Debugging steps:
+1. **Add print statements** to see what's happening:
+   print(f"My result is: {{result}}")
+
+2. **Check the instructions** - did you miss a requirement?
+
+3. **Compare to hints** - are you using the right approach?
+
+4. **Test manually** - try calling your function:
+   print({d['function']}({d.get('input')}))
+
+5. **Check for typos** in variable names and operations
+
+6. **Verify your logic** - step through mentally line by line
+"""
+
+
+def _render_function_not_found(d: Dict) -> str:
+    function_name = d['function']
+    defined_functions: List[str] = d.get('defined_functions') or []
+
+    msg = f"""❌ Function '{function_name}' Not Found
+
+"""
+
+    if not d['has_def']:
+        msg += """💡 You haven't defined any function yet!
+
+How to define a function:
+```python
+def function_name():
+    # Your code here
+    return result
+```
+
+Steps:
+1. Start with 'def' keyword
+2. Add function name
+3. Add parentheses ()
+4. Add colon :
+5. Indent the code inside (4 spaces or Tab)
+"""
+    elif not d['has_function_name']:
+        msg += f"""💡 Function name doesn't match!
+
+You wrote: {defined_functions if defined_functions else 'no functions'}
+Should be: {function_name}
+
+Check for:
+- Typos in the name
+- Capitalization (Python is case-sensitive!)
+- Extra/missing characters
+"""
+    else:
+        msg += f"""💡 Function exists but isn't callable
+
+Possible issues:
+1. **Indentation error** - 'def' should start at column 0
+2. **Syntax error** - check for missing colons ':'
+3. **Not in the right scope** - function defined inside another function?
+
+Your code has {d['def_count']} 'def' keyword(s)
+"""
+
+    return msg
+
+
+def _render_complexity(d: Dict) -> str:
+    timings = "\n".join(
+        f"  n = {size:>7}: {seconds * 1000:.3f} ms" for size, seconds in d['timings']
+    )
+
+    if d['code'] == 'complexity_mismatch':
+        grows_like = d['estimated_complexity'] or 'too slow to measure'
+        msg = f"""❌ Solution Doesn't Scale Well Enough
+
+Allowed: {d['max_complexity']}
+Your solution grows like: {grows_like}
+"""
+    else:
+        msg = f"""❌ Solution Is Too Slow
+
+Time budget: {d['time_budget']}s for the largest input
+"""
+
+    msg += f"""
+Measured times:
+{timings}
+"""
+    if d['stopped_early']:
+        msg += "(Larger inputs were skipped because it was already too slow)\n"
+
+    msg += """
+💡 How to fix:
+- Look for a loop inside a loop - each one multiplies the work
+- 'x in my_list' checks every item; 'x in my_set' is instant
+- Avoid rebuilding lists or strings inside a loop
+- Built-ins like max(), sum() and sorted() are fast
+"""
+    return msg
+
@@ -0,0 +1,70 @@
+"""
+Submission Fingerprinting
+Hashes the structure of user code so equivalent solutions share results
+"""
+
+import ast
+import copy
+import hashlib
+
+
+class _DocstringStripper(ast.NodeTransformer):
+    """Drop docstrings from modules, classes and functions"""
+
+    def _strip(self, node):
+        self.generic_visit(node)
+        body = node.body
+        if (body and isinstance(body[0], ast.Expr)
+                and isinstance(body[0].value, ast.Constant)
+                and isinstance(body[0].value.value, str)):
+            node.body = body[1:]
+        return node
+
+    visit_Module = _strip
+    visit_ClassDef = _strip
+    visit_FunctionDef = _strip
+    visit_AsyncFunctionDef = _strip
+
+
+# Names through which code can read docstrings at runtime (directly, or by
+# building the name dynamically)
+_DOC_READERS = frozenset({
+    '__doc__', 'help', 'inspect', 'pydoc', 'getdoc',
+    'eval', 'exec', 'compile', '__import__', 'getattr', 'vars', '__dict__'
+})
+
+
+def _reads_docstrings(tree: ast.Module) -> bool:
+    """True if the code may look at docstrings, so they change its behaviour"""
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Name) and node.id in _DOC_READERS:
+            return True
+        if isinstance(node, ast.Attribute) and node.attr in _DOC_READERS:
+            return True
+        if isinstance(node, ast.alias) and node.name.split('.')[0] in _DOC_READERS:
+            return True
+        if isinstance(node, ast.Constant) and isinstance(node.value, str) and '__doc__' in node.value:
+            return True
+    return False
+
+
+def fingerprint_tree(tree: ast.Module) -> str:
+    """
+    Fingerprint a parsed submission.
+
+    Comments and formatting never reach the AST, docstrings are stripped
+    (unless the code can read them, see _reads_docstrings) and line/column
+    positions are left out, so two submissions that differ only in those
+    ways get the same fingerprint. The tree passed in is not modified.
+    """
+    if _reads_docstrings(tree):
+        stripped = tree
+    else:
+        stripped = _DocstringStripper().visit(copy.deepcopy(tree))
+    dump = ast.dump(stripped, annotate_fields=False, include_attributes=False)
+    return hashlib.sha256(dump.encode('utf-8')).hexdigest()
+
+
+def fingerprint_source(user_code: str) -> str:
+    """Fingerprint source code (raises SyntaxError if it doesn't parse)"""
+    return fingerprint_tree(ast.parse(user_code))
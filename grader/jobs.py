@@ -0,0 +1,194 @@
+"""
+Grading Queue
+Bounded in-process queue for asynchronous grading with job IDs
+"""
+
+import queue
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Dict, List, Optional
+
+
+class QueueFullError(Exception):
+    """Raised when the grading queue can't accept more jobs"""
+
+    def __init__(self, retry_after: int):
+        super().__init__(f"Grading queue is full, retry in {retry_after}s")
+        self.retry_after = retry_after
+
+
+class GradingQueue:
+    """Runs submissions on background threads and keeps results for polling"""
+
+    def __init__(self, test_runner, max_size: int = 64, workers: int = None,
+                 result_ttl: float = 600):
+        self.test_runner = test_runner
+        self.max_size = max_size
+        self.result_ttl = result_ttl  # seconds finished jobs stay pollable
+
+        # One dispatcher per sandbox process keeps every worker busy
+        if workers is None:
+            workers = test_runner.pool.size if test_runner.pool is not None else 1
+        self.workers = workers
+
+        self._queue = queue.Queue(maxsize=max_size)
+        self._jobs = {}
+        self._lock = threading.Lock()
+        self._threads = []
+
+        self._running = 0
+        self._completed = 0
+        self._rejected = 0
+        self._wait_times = deque(maxlen=500)      # seconds spent queued
+        self._service_times = deque(maxlen=500)   # seconds spent grading
+
+    def submit(self, user_code: str, test_cases: List[Dict],
+               on_complete: Callable[[Dict], None] = None,
+               on_error: Callable[[str], None] = None, **run_options) -> str:
+        """
+        Queue a submission and return its job ID
+
+        `run_options` are passed to TestRunner.run_tests, `on_complete` is
+        called with the results on the grading thread (`on_error` with the
+        error message if grading raised).
+
+        Raises:
+            QueueFullError: if the queue is at capacity
+        """
+        self._start()
+        self._prune()
+
+        job = {
+            'job_id': uuid.uuid4().hex,
+            'status': 'queued',
+            'submitted_at': time.time(),
+            'started_at': None,
+            'finished_at': None,
+            'result': None,
+            'error': None,
+            'user_code': user_code,
+            'test_cases': test_cases,
+            'run_options': run_options,
+            'on_complete': on_complete,
+            'on_error': on_error
+        }
+
+        with self._lock:
+            try:
+                self._queue.put_nowait(job)
+            except queue.Full:
+                self._rejected += 1
+                raise QueueFullError(self.retry_after())
+            self._jobs[job['job_id']] = job
+
+        return job['job_id']
+
+    def get_job(self, job_id: str) -> Optional[Dict]:
+        """Public status of a job, or None if unknown or expired"""
+        job = self._jobs.get(job_id)
+        if job is None:
+            return None
+
+        status = {
+            'job_id': job['job_id'],
+            'status': job['status'],
+            'result': job['result'],
+            'error': job['error']
+        }
+        if job['started_at'] is not None:
+            status['wait_time'] = round(job['started_at'] - job['submitted_at'], 3)
+        return status
+
+    def retry_after(self) -> int:
+        """Estimated seconds until the queue has room again"""
+        service = self._service_times
+        avg_service = sum(service) / len(service) if service else 1.0
+        estimate = self._queue.qsize() * avg_service / max(self.workers, 1)
+        return max(1, int(estimate + 0.999))
+
+    def stats(self) -> Dict:
+        """Queue depth, throughput and wait times"""
+        with self._lock:
+            waits = sorted(self._wait_times)
+        return {
+            'depth': self._queue.qsize(),
+            'max_size': self.max_size,
+            'running': self._running,
+            'workers': self.workers,
+            'completed': self._completed,
+            'rejected': self._rejected,
+            'avg_wait': round(sum(waits) / len(waits), 3) if waits else 0,
+            'p95_wait': round(waits[int(len(waits) * 0.95)], 3) if waits else 0
+        }
+
+    def _start(self):
+        """Start dispatcher threads on first use"""
+        if self._threads:
+            return
+        with self._lock:
+            if self._threads:
+                return
+            for i in range(self.workers):
+                thread = threading.Thread(
+                    target=self._dispatch,
+                    name=f'grading-dispatcher-{i}',
+                    daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+
+    def _dispatch(self):
+        """Dispatcher loop: grade queued jobs one at a time"""
+        while True:
+            job = self._queue.get()
+            job['started_at'] = time.time()
+            job['status'] = 'running'
+            with self._lock:
+                self._wait_times.append(job['started_at'] - job['submitted_at'])
+                self._running += 1
+
+            result = error = None
+            try:
+                result = self.test_runner.run_tests(
+                    job['user_code'], job['test_cases'], **job['run_options']
+                )
+            except Exception as e:
+                error = f"{type(e).__name__}: {str(e)}"
+
+            # The job only reads as finished once its callback (e.g. recording
+            # progress) has run, so a client polling for it sees the effects
+            try:
+                if result is not None and job['on_complete'] is not None:
+                    job['on_complete'](result)
+                elif error is not None and job['on_error'] is not None:
+                    job['on_error'](error)
+            except Exception as e:
+                print(f"Error in grading callback for job {job['job_id']}: {e}")
+            finally:
+                job['result'] = result
+                job['error'] = error
+                job['finished_at'] = time.time()
+                job['status'] = 'done' if result is not None else 'error'
+                with self._lock:
+                    self._service_times.append(job['finished_at'] - job['started_at'])
+                    self._running -= 1
+                    self._completed += 1
+
+                # The code, tests and callbacks aren't needed once graded
+                job['user_code'] = job['test_cases'] = None
+                job['on_complete'] = job['on_error'] = None
+                job['run_options'] = None
+                self._queue.task_done()
+
+    def _prune(self):
+        """Forget finished jobs older than result_ttl"""
+        cutoff = time.time() - self.result_ttl
+        with self._lock:
+            expired = [
+                job_id for job_id, job in self._jobs.items()
+                if job['finished_at'] is not None and job['finished_at'] < cutoff
+            ]
+            for job_id in expired:
+                del self._jobs[job_id]
@@ -0,0 +1,105 @@
+"""
+Grading Metrics
+Per-challenge percentiles of the resources submissions use while grading
+"""
+
+import threading
+from collections import deque
+from typing import Dict, List, Optional
+
+# Resource fields recorded on every test result
+RESOURCE_FIELDS = ('wall_time', 'cpu_time', 'peak_memory')
+
+
+def percentile(sorted_values: List[float], pct: float) -> Optional[float]:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, int(round(pct / 100 * len(sorted_values))) - 1))
+    return sorted_values[index]
+
+
+class GradingMetrics:
+    """Keeps a sliding window of per-test resource samples for each challenge"""
+
+    PERCENTILES = (50, 90, 99)
+
+    def __init__(self, window: int = 1000):
+        self.window = window  # samples kept per challenge / test
+        self._challenges = {}  # challenge_id -> {'submissions': n, 'total': {...}, 'tests': {...}}
+        self._lock = threading.Lock()
+
+    def record(self, challenge_id: str, results: Dict):
+        """Add the resource usage of a finished grading"""
+        if not results['test_results']:
+            return
+
+        with self._lock:
+            entry = self._challenges.get(challenge_id)
+            if entry is None:
+                entry = self._challenges[challenge_id] = {
+                    'submissions': 0,
+                    'total': self._new_samples(),
+                    'tests': {}
+                }
+            entry['submissions'] += 1
+
+            # Only fields measured on at least one test (peak_memory isn't
+            # always measured, and timed-out tests have no samples)
+            totals = {}
+            for test_result in results['test_results']:
+                samples = entry['tests'].get(test_result['test_number'])
+                if samples is None:
+                    samples = entry['tests'][test_result['test_number']] = self._new_samples()
+
+                for field in RESOURCE_FIELDS:
+                    value = test_result.get(field)
+                    if value is None:
+                        continue
+                    samples[field].append(value)
+                    if field == 'peak_memory':
+                        totals[field] = max(totals.get(field, 0), value)
+                    else:
+                        totals[field] = totals.get(field, 0) + value
+
+            for field, total in totals.items():
+                entry['total'][field].append(total)
+
+    def get_challenge(self, challenge_id: str) -> Optional[Dict]:
+        """Percentiles for one challenge: per submission and per test"""
+        with self._lock:
+            entry = self._challenges.get(challenge_id)
+            if entry is None:
+                return None
+            return {
+                'challenge_id': challenge_id,
+                'submissions': entry['submissions'],
+                'total': self._summarize(entry['total']),
+                'tests': {
+                    test_number: self._summarize(samples)
+                    for test_number, samples in sorted(entry['tests'].items())
+                }
+            }
+
+    def get_summary(self) -> Dict:
+        """Per-submission percentiles for every challenge seen so far"""
+        with self._lock:
+            return {
+                challenge_id: {
+                    'submissions': entry['submissions'],
+                    'total': self._summarize(entry['total'])
+                }
+                for challenge_id, entry in self._challenges.items()
+            }
+
+    def _new_samples(self) -> Dict:
+        return {field: deque(maxlen=self.window) for field in RESOURCE_FIELDS}
+
+    def _summarize(self, samples: Dict) -> Dict:
+        summary = {}
+        for field, values in samples.items():
+            ordered = sorted(values)
+            summary[field] = {
+                f'p{pct}': percentile(ordered, pct) for pct in self.PERCENTILES
+            }
+        return summary
@@ -0,0 +1,294 @@
+"""
+Sandbox Pool
+Pre-started worker processes that grade submissions under hard time limits
+"""
+
+import marshal
+import multiprocessing
+import os
+import pickle
+import queue
+import signal
+import threading
+import time
+import atexit
+from typing import Callable, Dict, List, Optional
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def _set_cpu_limit(cpu_limit: float):
+    """Allow the worker `cpu_limit` more seconds of CPU before SIGXCPU"""
+    if resource is None:
+        return
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    used = usage.ru_utime + usage.ru_stime
+    soft = int(used + cpu_limit) + 1
+    _, hard = resource.getrlimit(resource.RLIMIT_CPU)
+    if hard != resource.RLIM_INFINITY:
+        soft = min(soft, hard)
+    # Only the soft limit moves - a lowered hard limit could never be raised again
+    resource.setrlimit(resource.RLIMIT_CPU, (soft, hard))
+
+
+def _make_test_transferable(test_result: Dict) -> Dict:
+    """Replace values that can't be pickled (e.g. instances of user classes)"""
+    for key in ('actual', 'expected'):
+        try:
+            pickle.dumps(test_result.get(key))
+        except Exception:
+            test_result[key] = repr(test_result.get(key))
+    return test_result
+
+
+def _make_transferable(results: Dict) -> Dict:
+    """Make a whole set of results safe to send to the parent"""
+    try:
+        pickle.dumps(results)
+        return results
+    except Exception:
+        pass
+
+    for test_result in results.get('test_results', []):
+        _make_test_transferable(test_result)
+    return results
+
+
+def _worker_main(conn, cpu_limit: float, runner_options: Dict):
+    """
+    Worker loop: receive (source, marshalled code, tests, options) jobs and
+    send back results
+
+    Every message sent is a (kind, payload) tuple: ('test', test_result) for
+    each finished test when streaming, then ('done', results).
+    """
+    from .test_runner import TestRunner
+
+    # Ctrl+C is handled by the parent, which shuts the pool down
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+
+    runner = TestRunner(**runner_options)
+    while True:
+        try:
+            job = conn.recv()
+        except (EOFError, OSError):
+            break
+        if job is None:
+            break
+
+        user_code, code_bytes, test_cases, options = job
+
+        on_test_result = None
+        if options['stream']:
+            def on_test_result(test_result):
+                conn.send(('test', _make_test_transferable(dict(test_result))))
+
+        _set_cpu_limit(cpu_limit)
+        try:
+            # The parent already analyzed the code, and applies the output
+            # policy after caching
+            results = runner.run_compiled(
+                user_code, marshal.loads(code_bytes), test_cases,
+                on_test_result=on_test_result,
+                mode=options['mode']
+            )
+        except BaseException as e:
+            # SystemExit / KeyboardInterrupt raised by user code
+            results = _error_results(test_cases, f"{type(e).__name__}: {str(e)}")
+
+        try:
+            conn.send(('done', _make_transferable(results)))
+        except (EOFError, OSError):
+            break
+
+
+def _error_results(test_cases: List[Dict], error: str) -> Dict:
+    """Results for a submission that could not be graded at all"""
+    return {
+        'passed': False,
+        'total_tests': len(test_cases),
+        'passed_tests': 0,
+        'failed_tests': len(test_cases),
+        'test_results': [],
+        'error': error,
+        'execution_time': 0,
+        'cached': False,
+        'skipped_tests': 0
+    }
+
+
+class _Worker:
+    """A sandbox process and the parent's end of its pipe"""
+
+    def __init__(self, process, conn):
+        self.process = process
+        self.conn = conn
+
+
+class SandboxPool:
+    """Fixed-size pool of pre-started grading processes"""
+
+    def __init__(self, size: int = None, timeout: float = 5, cpu_limit: float = None,
+                 runner_options: Dict = None):
+        self.size = size or os.cpu_count() or 1
+        self.timeout = timeout  # wall-clock seconds per submission
+        self.cpu_limit = cpu_limit or timeout  # CPU seconds per submission
+        self.runner_options = runner_options or {}
+
+        # Workers (and their replacements) are started from a clean
+        # single-threaded server process with the runner already imported,
+        # not forked from threads of the web server, which could hand them
+        # locks held by other threads
+        if 'forkserver' in multiprocessing.get_all_start_methods():
+            self._context = multiprocessing.get_context('forkserver')
+            self._context.set_forkserver_preload(['grader.test_runner'])
+        else:
+            self._context = multiprocessing.get_context('spawn')
+
+        self._idle = queue.Queue()
+        self._workers = []
+        self._lock = threading.Lock()
+        self._started = False
+        self.stats = {
+            'jobs': 0,
+            'timeouts': 0,
+            'crashes': 0,
+            'workers_replaced': 0
+        }
+
+    def start(self):
+        """Start the worker processes (called lazily on first use)"""
+        with self._lock:
+            if self._started:
+                return
+            for _ in range(self.size):
+                self._idle.put(self._spawn())
+            self._started = True
+            atexit.register(self.close)
+
+    def close(self):
+        """Stop all worker processes"""
+        with self._lock:
+            if not self._started:
+                return
+            self._started = False
+            workers, self._workers = self._workers, []
+
+        for worker in workers:
+            try:
+                worker.conn.send(None)
+            except (EOFError, OSError):
+                pass
+        for worker in workers:
+            worker.process.join(timeout=1)
+            self._kill(worker)
+
+    def run(self, user_code: str, code_obj, test_cases: List[Dict],
+            on_test_result: Callable[[Dict], None] = None, mode: str = 'sequential') -> Dict:
+        """
+        Grade an analyzed submission (and its compiled code) on the next idle worker
+
+        If `on_test_result` is given it's called with each test result as
+        the worker finishes it. The timeout covers the whole submission.
+        `mode` is passed on to the worker's TestRunner.run_compiled.
+        """
+        self.start()
+        worker = self._idle.get()
+
+        try:
+            worker.conn.send((user_code, marshal.dumps(code_obj), test_cases, {
+                'stream': on_test_result is not None,
+                'mode': mode
+            }))
+            deadline = time.monotonic() + self.timeout
+
+            while True:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not worker.conn.poll(remaining):
+                    self.stats['timeouts'] += 1
+                    return _error_results(test_cases, self._timeout_message())
+
+                kind, payload = worker.conn.recv()
+                if kind == 'test':
+                    on_test_result(payload)
+                    continue
+
+                self._idle.put(worker)
+                worker = None
+                self.stats['jobs'] += 1
+                return payload
+
+        except (EOFError, OSError):
+            # Worker died mid-job (CPU limit, os._exit, segfault, ...)
+            self.stats['crashes'] += 1
+            worker.process.join(timeout=1)
+            return _error_results(test_cases, self._crash_message(worker.process.exitcode))
+
+        finally:
+            if worker is not None:
+                self._replace(worker)
+
+    def _spawn(self) -> _Worker:
+        """Start a new worker process"""
+        parent_conn, child_conn = self._context.Pipe()
+        process = self._context.Process(
+            target=_worker_main,
+            args=(child_conn, self.cpu_limit, self.runner_options),
+            daemon=True
+        )
+        process.start()
+        child_conn.close()
+
+        worker = _Worker(process, parent_conn)
+        self._workers.append(worker)
+        return worker
+
+    def _kill(self, worker: _Worker):
+        """Make sure a worker process is gone"""
+        if worker.process.is_alive():
+            worker.process.terminate()
+            worker.process.join(timeout=1)
+        if worker.process.is_alive():
+            worker.process.kill()
+            worker.process.join()
+        worker.conn.close()
+
+    def _replace(self, worker: _Worker):
+        """Kill a hung or dead worker and put a fresh one in its place"""
+        self._kill(worker)
+        with self._lock:
+            if worker in self._workers:
+                self._workers.remove(worker)
+            if not self._started:
+                return
+            self._idle.put(self._spawn())
+        self.stats['workers_replaced'] += 1
+
+    def _timeout_message(self) -> str:
+        return f"""⏱️ Time Limit Exceeded
+
+Your code ran for more than {self.timeout} seconds and was stopped.
+
+💡 How to fix:
+- Look for loops that never end: while True: needs a break
+- Check that your loop variable actually changes each time
+- Recursive functions need a base case that stops the recursion
+"""
+
+    def _crash_message(self, exitcode: Optional[int]) -> str:
+        if resource is not None and exitcode == -signal.SIGXCPU:
+            return f"""⏱️ CPU Limit Exceeded
+
+Your code used more than {self.cpu_limit} seconds of CPU time and was stopped.
+
+💡 Look for loops that never end or work that repeats far more than needed.
+"""
+        return f"""💥 Your Code Stopped the Grader
+
+The process running your code exited unexpectedly (exit code {exitcode}).
+
+💡 Don't call exit(), os._exit() or similar inside your solution.
+"""
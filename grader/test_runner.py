@@ -3,131 +3,596 @@ Test Runner
 Safely executes user code and runs test cases
 """
 
+import copy
 import sys
-import io
 import traceback
-from typing import Dict, List, Any
-import ast
+import types
+from typing import Callable, Dict, List, Any, Optional
 import time
+import threading
+import tracemalloc
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+
+from .sandbox import SandboxPool
+from .cache import ResultCache
+from .analysis import CodeAnalyzer, FORBIDDEN_IMPORTS, FORBIDDEN_CALLS, forbidden_message
+from .capture import capture_output, CappedBuffer
+from .metrics import GradingMetrics
+from .complexity import measure_scaling
+from .comparators import ComparatorCache
+from .diagnostics import (diagnose_mismatch, diagnose_missing_function,
+                          diagnose_complexity, summarize, render, preview_value)
+
+
+# Values a test can't change in place
+_IMMUTABLE_TYPES = (int, float, complex, str, bytes, bool, type(None), range, type(Ellipsis))
+
+# Values that copy as themselves but hold no per-test state (functions are
+# checked by _carries_state)
+_SHARED_TYPES = (types.ModuleType, types.BuiltinFunctionType, types.FunctionType, type)
+
+
+def _is_immutable(value) -> bool:
+    if isinstance(value, (tuple, frozenset)):
+        return all(_is_immutable(item) for item in value)
+    return isinstance(value, _IMMUTABLE_TYPES)
+
+
+def _is_submission_defined(value) -> bool:
+    """False for functions and classes imported from real modules"""
+    module = sys.modules.get(getattr(value, '__module__', None))
+    return getattr(module, getattr(value, '__qualname__', ''), None) is not value
+
+
+# Seconds to deep-copy one item of a container, measured on first use
+_copy_cost = None
+
+
+def _copy_cost_per_item() -> float:
+    global _copy_cost
+    if _copy_cost is None:
+        # A flat list is about the cheapest data to copy, so estimates made
+        # with this err towards taking a snapshot (which is then timed)
+        sample = list(range(2000))
+        started = time.perf_counter()
+        copy.deepcopy(sample)
+        _copy_cost = (time.perf_counter() - started) / len(sample)
+    return _copy_cost
+
+
+def _estimated_copy_time(namespace: Dict) -> float:
+    """Rough cost of deep-copying a namespace, from its containers' lengths"""
+    items = len(namespace)
+    for value in namespace.values():
+        if isinstance(value, (list, tuple, dict, set, frozenset)):
+            items += len(value)
+    return items * _copy_cost_per_item()
+
+
+def _is_source_specific(results: Dict) -> bool:
+    """
+    True if results depend on the exact source, not just its fingerprint
+
+    Tracebacks point at lines of one submission, and missing-function
+    diagnostics look at the raw text (comments included).
+    """
+    return any(
+        test_result.get('traceback')
+        or (test_result.get('diagnostic') or {}).get('code') == 'function_not_found'
+        for test_result in results['test_results']
+    )
+
+
+def _carries_state(value) -> bool:
+    """
+    True if a namespace value keeps state a snapshot can't reset
+
+    Snapshots deep-copy values, but functions and classes copy as
+    themselves, so mutable defaults, closures and class attributes
+    (even immutable ones can be rebound) would be shared by every test.
+    Function attributes are restored separately.
+    """
+    if isinstance(value, type):
+        return _is_submission_defined(value)
+    if isinstance(value, types.FunctionType) and _is_submission_defined(value):
+        if value.__closure__:
+            return True
+        defaults = (value.__defaults__ or ()) + tuple((value.__kwdefaults__ or {}).values())
+        return not all(_is_immutable(default) for default in defaults)
+    return False
 
 
 class TestRunner:
     """Safely runs user code and test cases"""
     
-    def __init__(self):
-        self.timeout = 5  # seconds
+    # sequential: run every test in order
+    # fail_fast:  stop at the first failing test
+    # parallel:   spread tests over sandbox workers (sequential without a pool)
+    MODES = ('sequential', 'fail_fast', 'parallel')
+    
+    def __init__(self, exec_once: bool = True, sandbox: bool = False,
+                 workers: int = None, timeout: float = 5, cache: ResultCache = None,
+                 max_output_bytes: int = 64 * 1024, measure_memory: bool = False,
+                 forbidden_imports=FORBIDDEN_IMPORTS, forbidden_calls=FORBIDDEN_CALLS):
+        self.timeout = timeout  # seconds
+        self.max_output_bytes = max_output_bytes  # per test, extra output is dropped
+        
+        # Peak memory uses tracemalloc, which slows allocation-heavy code a
+        # lot and is process-wide (only exact when one test runs at a time,
+        # as in sandbox workers), so it's opt-in
+        self.measure_memory = measure_memory
+        
+        # Per-challenge resource percentiles of fresh (uncached) gradings
+        self.metrics = GradingMetrics()
+        
+        # Expected values compiled into comparison plans, reused across submissions
+        self.comparators = ComparatorCache()
+        
+        # Static analysis shared by validate_code and run_tests; submissions
+        # using forbidden imports/calls are rejected before they run
+        self.analyzer = CodeAnalyzer(forbidden_imports=forbidden_imports,
+                                     forbidden_calls=forbidden_calls)
+        # Execute module-level code once per submission and give each test
+        # a fresh snapshot of the resulting namespace (False = re-exec per test)
+        self.exec_once = exec_once
+        
+        # Grade in pre-started worker processes with hard time limits
+        # (pool size defaults to the CPU count, processes start on first use)
+        self.pool = None
+        if sandbox:
+            self.pool = SandboxPool(
+                size=workers,
+                timeout=timeout,
+                runner_options={
+                    'exec_once': exec_once,
+                    'max_output_bytes': max_output_bytes,
+                    'measure_memory': measure_memory,
+                    'forbidden_imports': forbidden_imports,
+                    'forbidden_calls': forbidden_calls
+                }
+            )
+        
+        # Shared results for repeat submissions of unchanged code
+        self.cache = cache
     
-    def run_tests(self, user_code: str, test_cases: List[Dict]) -> Dict:
+    def run_tests(self, user_code: str, test_cases: List[Dict], challenge_id: str = None,
+                  include_output: bool = False,
+                  on_test_result: Callable[[Dict], None] = None,
+                  mode: str = 'sequential', explain: bool = False) -> Dict:
         """
         Run test cases against user code
         
         Args:
             user_code: The code submitted by the user
             test_cases: List of test case dictionaries
+            challenge_id: Used to group cache statistics per challenge
+            include_output: Keep captured output for passing tests too
+                (failing tests always keep theirs)
+            on_test_result: Called with each test result as soon as it
+                is available (replayed in order on a cache hit)
+            mode: One of TestRunner.MODES
+            explain: Give failing tests the full educational message
+                instead of a one-line summary (see grader.diagnostics)
         
         Returns:
             Dictionary with test results
         """
-        results = {
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown grading mode: {mode}")
+        
+        results = self._new_results(test_cases)
+        
+        # First, check if code is syntactically valid
+        try:
+            analysis = self.analyzer.analyze(user_code)
+        except SyntaxError as e:
+            results['error'] = f"Syntax Error: {str(e)}"
+            return results
+        
+        if analysis['forbidden']:
+            results['error'] = forbidden_message(analysis['forbidden'])
+            return results
+        
+        cache_key = None
+        # Complexity verdicts come from timings that depend on machine load,
+        # so they're measured afresh for every submission
+        timed = any(test_case.get('type') == 'complexity' for test_case in test_cases)
+        if self.cache is not None and not timed:
+            # Submissions differing only in comments, docstrings or
+            # formatting share one cache entry, unless the results are
+            # specific to the exact source (see _is_source_specific)
+            # (parallel grading gives the same results as sequential)
+            cache_key = self.cache.make_key(
+                analysis['fingerprint'], test_cases,
+                variant='fail_fast' if mode == 'fail_fast' else ''
+            )
+        if cache_key is not None:
+            cached = self.cache.get(cache_key, label=challenge_id, source=analysis['source_hash'])
+            if cached is not None:
+                cached['cached'] = True
+                self._apply_output_policy(cached, include_output, explain)
+                if on_test_result is not None:
+                    for test_result in cached['test_results']:
+                        on_test_result(test_result)
+                return cached
+        
+        emit = None
+        if on_test_result is not None:
+            def emit(test_result):
+                # Copy, so the original keeps its output for the cache
+                on_test_result(self._apply_test_output_policy(dict(test_result), include_output, explain))
+        
+        if self.pool is not None:
+            if mode == 'parallel' and len(test_cases) > 1:
+                results = self._run_parallel(user_code, analysis['code'], test_cases, on_test_result=emit)
+            else:
+                results = self.pool.run(user_code, analysis['code'], test_cases,
+                                        on_test_result=emit, mode=mode)
+        else:
+            self._run_local(user_code, analysis['code'], test_cases, results, on_test_result=emit,
+                            fail_fast=(mode == 'fail_fast'))
+        
+        if challenge_id is not None:
+            self.metrics.record(challenge_id, results)
+        
+        # Timeouts and crashes may be transient, so only cache real gradings
+        interrupted = any(test_result.get('interrupted') for test_result in results['test_results'])
+        if cache_key is not None and not results['error'] and not interrupted:
+            source = analysis['source_hash'] if _is_source_specific(results) else None
+            self.cache.put(cache_key, results, source=source)
+        
+        return self._apply_output_policy(results, include_output, explain)
+    
+    def _apply_output_policy(self, results: Dict, include_output: bool,
+                             explain: bool = False) -> Dict:
+        """
+        Drop captured output of passing tests unless the client asked for it,
+        and render full error messages if asked to
+        """
+        for test_result in results['test_results']:
+            self._apply_test_output_policy(test_result, include_output, explain)
+        return results
+    
+    def _apply_test_output_policy(self, test_result: Dict, include_output: bool,
+                                  explain: bool = False) -> Dict:
+        """Output policy for a single test result"""
+        if not include_output and test_result['passed']:
+            test_result['output'] = ''
+        if explain and test_result.get('diagnostic'):
+            test_result['error'] = render(test_result['diagnostic'])
+        return test_result
+    
+    def run_compiled(self, user_code: str, code_obj, test_cases: List[Dict],
+                     on_test_result: Callable[[Dict], None] = None,
+                     mode: str = 'sequential') -> Dict:
+        """
+        Grade code that run_tests already analyzed, in this process
+        
+        No syntax, import or cache checks and no output policy: this is the
+        part of grading sandbox workers do for the parent.
+        """
+        results = self._new_results(test_cases)
+        self._run_local(user_code, code_obj, test_cases, results, on_test_result=on_test_result,
+                        fail_fast=(mode == 'fail_fast'))
+        return results
+    
+    def _new_results(self, test_cases: List[Dict]) -> Dict:
+        return {
             'passed': False,
             'total_tests': len(test_cases),
             'passed_tests': 0,
             'failed_tests': 0,
             'test_results': [],
             'error': None,
-            'execution_time': 0
+            'execution_time': 0,
+            'cached': False,
+            'skipped_tests': 0
         }
+    
+    def _run_local(self, user_code: str, code_obj, test_cases: List[Dict], results: Dict,
+                   on_test_result: Callable[[Dict], None] = None, fail_fast: bool = False):
+        """Run test cases in this process, filling in `results`"""
+        start_time = time.perf_counter()
         
-        # First, check if code is syntactically valid
-        try:
-            ast.parse(user_code)
-        except SyntaxError as e:
-            results['error'] = f"Syntax Error: {str(e)}"
-            return results
-        
-        # Run each test case
-        start_time = time.time()
+        # The first test always runs on the freshly executed module
+        module = None
+        if self.exec_once:
+            module = self._execute_module(code_obj)
         
         for i, test_case in enumerate(test_cases):
-            test_result = self._run_single_test(user_code, test_case, i + 1)
+            if module is not None and i > 0 and not module['error']:
+                if module['snapshot'] is None:
+                    # No snapshot worth restoring (see _execute_module):
+                    # run the remaining tests from scratch
+                    module = None
+                else:
+                    # Earlier tests may have mutated module state
+                    self._restore_namespace(module['namespace'], module['snapshot'])
+                    for func, attributes in module['function_attributes']:
+                        func.__dict__ = copy.deepcopy(attributes)
+            test_result = self._run_single_test(user_code, code_obj, test_case, i + 1, module)
             results['test_results'].append(test_result)
+            if on_test_result is not None:
+                on_test_result(test_result)
             
             if test_result['passed']:
                 results['passed_tests'] += 1
             else:
                 results['failed_tests'] += 1
+                if fail_fast:
+                    break
         
-        results['execution_time'] = time.time() - start_time
+        results['skipped_tests'] = len(test_cases) - len(results['test_results'])
+        results['execution_time'] = time.perf_counter() - start_time
         results['passed'] = results['passed_tests'] == results['total_tests']
+    
+    def _run_parallel(self, user_code: str, code_obj, test_cases: List[Dict],
+                      on_test_result: Callable[[Dict], None] = None) -> Dict:
+        """Grade each test case as its own job on the sandbox pool"""
+        start_time = time.perf_counter()
+        test_results = [None] * len(test_cases)
+        
+        # Stream results in test order even though they finish out of order
+        emit_lock = threading.Lock()
+        next_to_emit = [0]
+        
+        def run_one(index):
+            test_case = test_cases[index]
+            sub_results = self.pool.run(user_code, code_obj, [test_case])
+            
+            if sub_results['test_results']:
+                test_result = sub_results['test_results'][0]
+                test_result['test_number'] = index + 1
+                if 'description' not in test_case:
+                    test_result['description'] = f'Test {index + 1}'
+            else:
+                # This test timed out or crashed its worker (flagged so the
+                # grading isn't cached, like a sequential timeout)
+                test_result = {
+                    'test_number': index + 1,
+                    'description': test_case.get('description', f'Test {index + 1}'),
+                    'passed': False,
+                    'expected': preview_value(test_case.get('expected')),
+                    'actual': None,
+                    'error': sub_results['error'],
+                    'output': '',
+                    'wall_time': None,
+                    'cpu_time': None,
+                    'peak_memory': None,
+                    'interrupted': True
+                }
+            
+            with emit_lock:
+                test_results[index] = test_result
+                while next_to_emit[0] < len(test_results) and test_results[next_to_emit[0]] is not None:
+                    if on_test_result is not None:
+                        on_test_result(test_results[next_to_emit[0]])
+                    next_to_emit[0] += 1
+        
+        with ThreadPoolExecutor(max_workers=min(len(test_cases), self.pool.size)) as executor:
+            list(executor.map(run_one, range(len(test_cases))))
+        
+        passed_tests = sum(1 for test_result in test_results if test_result['passed'])
+        return {
+            'passed': passed_tests == len(test_cases),
+            'total_tests': len(test_cases),
+            'passed_tests': passed_tests,
+            'failed_tests': len(test_cases) - passed_tests,
+            'test_results': test_results,
+            'error': None,
+            'execution_time': time.perf_counter() - start_time,
+            'cached': False,
+            'skipped_tests': 0
+        }
+    
+    def precompile(self, test_cases: List[Dict]):
+        """Compile the comparison plans of a test suite ahead of the first submission"""
+        for test_case in test_cases:
+            if test_case.get('type') != 'complexity':
+                self.comparators.get(test_case.get('expected'))
+    
+    def get_stats(self) -> Dict:
+        """Grading cache, worker pool and code analysis statistics"""
+        return {
+            'cache': self.cache.stats() if self.cache is not None else None,
+            'pool': dict(self.pool.stats) if self.pool is not None else None,
+            'analysis': self.analyzer.stats()
+        }
+    
+    def _new_namespace(self) -> Dict:
+        """Create an isolated namespace for user code"""
+        return {
+            '__builtins__': __builtins__,
+            'print': print  # Allow printing
+        }
+    
+    def _execute_module(self, code_obj) -> Dict:
+        """
+        Execute compiled user code once and snapshot the resulting namespace
         
-        return results
+        Restoring the snapshot deep-copies it before every test, so there is
+        no snapshot (None) when copying costs more than executing the code
+        again, or when it can't isolate tests (see _carries_state).
+        """
+        module = {
+            'namespace': self._new_namespace(),
+            'snapshot': None,
+            'output': '',
+            'output_buffer': None,
+            'error': None,
+            'traceback': None,
+            'function_attributes': []
+        }
+        
+        started = time.perf_counter()
+        with capture_output(CappedBuffer(self.max_output_bytes)) as captured_output:
+            try:
+                exec(code_obj, module['namespace'])
+            except Exception as e:
+                module['error'] = f"{type(e).__name__}: {str(e)}"
+                module['traceback'] = traceback.format_exc()
+        exec_time = time.perf_counter() - started
+        module['output'] = captured_output.getvalue()
+        module['output_buffer'] = captured_output
+        
+        values = [value for name, value in module['namespace'].items() if name != '__builtins__']
+        if module['error'] or _estimated_copy_time(module['namespace']) > exec_time:
+            return module
+        if any(_carries_state(value) for value in values):
+            # Mutable defaults, class attributes, closures, ...
+            return module
+        
+        uncopied = []
+        started = time.perf_counter()
+        snapshot = self._snapshot_namespace(module['namespace'], uncopied)
+        if uncopied or time.perf_counter() - started > exec_time:
+            return module
+        
+        module['snapshot'] = snapshot
+        # Tests can set attributes on functions (e.g. a call counter)
+        module['function_attributes'] = [
+            (value, copy.deepcopy(value.__dict__)) for value in values
+            if isinstance(value, types.FunctionType) and _is_submission_defined(value)
+        ]
+        return module
+    
+    def _snapshot_namespace(self, namespace: Dict, uncopied: List[str] = None) -> Dict:
+        """
+        Deep-copy namespace values so tests can't see each other's side effects.
+        
+        Functions and classes copy as themselves (see _carries_state) and
+        modules are shared. Other values that can't be copied (generators,
+        ...) or copy as themselves (lru_cache wrappers, ...) are shared
+        as-is and their names added to `uncopied`. A single memo keeps
+        aliasing between names intact.
+        """
+        memo = {}
+        snapshot = {}
+        for name, value in namespace.items():
+            if name == '__builtins__' or isinstance(value, _SHARED_TYPES):
+                snapshot[name] = value
+                continue
+            try:
+                snapshot[name] = copy.deepcopy(value, memo)
+                shared = snapshot[name] is value and not _is_immutable(value)
+            except Exception:
+                snapshot[name] = value
+                shared = True
+            if shared and uncopied is not None:
+                uncopied.append(name)
+        return snapshot
+    
+    def _restore_namespace(self, namespace: Dict, snapshot: Dict):
+        """Reset namespace in place so user functions keep their __globals__"""
+        namespace.clear()
+        namespace.update(self._snapshot_namespace(snapshot))
     
-    def _run_single_test(self, user_code: str, test_case: Dict, test_num: int) -> Dict:
-        """Run a single test case"""
+    @contextmanager
+    def _instrument(self, result: Dict):
+        """Record wall time, CPU time and (optionally) peak memory of a test"""
+        started_tracing = False
+        if self.measure_memory:
+            if tracemalloc.is_tracing():
+                baseline = tracemalloc.get_traced_memory()[0]
+                tracemalloc.reset_peak()
+            else:
+                tracemalloc.start()
+                started_tracing = True
+                baseline = 0
+        
+        wall_start = time.perf_counter()
+        cpu_start = time.thread_time()
+        try:
+            yield
+        finally:
+            result['wall_time'] = time.perf_counter() - wall_start
+            result['cpu_time'] = time.thread_time() - cpu_start
+            if self.measure_memory:
+                result['peak_memory'] = max(0, tracemalloc.get_traced_memory()[1] - baseline)
+                if started_tracing:
+                    tracemalloc.stop()
+    
+    def _run_single_test(self, user_code: str, code_obj, test_case: Dict, test_num: int,
+                         module: Optional[Dict] = None) -> Dict:
+        """
+        Run a single test case
+        
+        If `module` comes from _execute_module the test runs against its
+        namespace, otherwise the compiled user code is executed from scratch.
+        """
         result = {
             'test_number': test_num,
             'description': test_case.get('description', f'Test {test_num}'),
             'passed': False,
-            'expected': test_case.get('expected'),
+            'expected': preview_value(test_case.get('expected')),
             'actual': None,
             'error': None,
-            'output': ''
+            'output': '',
+            'wall_time': None,
+            'cpu_time': None,
+            'peak_memory': None
         }
         
+        if module is not None and module['error']:
+            # Module-level code failed, so every test fails the same way
+            result['error'] = module['error']
+            result['traceback'] = module['traceback']
+            result['output'] = module['output']
+            return result
+        
         try:
-            # Create isolated namespace
-            namespace = {
-                '__builtins__': __builtins__,
-                'print': print  # Allow printing
-            }
-            
-            # Capture stdout
-            old_stdout = sys.stdout
-            sys.stdout = captured_output = io.StringIO()
+            if module is not None:
+                namespace = module['namespace']
+            else:
+                namespace = self._new_namespace()
             
-            try:
-                # Execute user code
-                exec(user_code, namespace)
-                
-                # Get the test input and expected output
-                test_input = test_case.get('input')
-                expected = test_case.get('expected')
-                function_name = test_case.get('function')
-                
-                # Call the function with test input
-                if function_name and function_name in namespace:
-                    func = namespace[function_name]
+            # Capture stdout for this execution only (safe across threads).
+            # Module-level prints happened once, but show on every test:
+            # the test's output continues from them, under one limit
+            if module is not None:
+                buffer = module['output_buffer'].copy()
+            else:
+                buffer = CappedBuffer(self.max_output_bytes)
+            with self._instrument(result), capture_output(buffer) as captured_output:
+                try:
+                    # Execute user code
+                    if module is None:
+                        exec(code_obj, namespace)
                     
-                    # Handle different input formats
-                    if isinstance(test_input, dict):
-                        actual = func(**test_input)
-                    elif isinstance(test_input, list):
-                        actual = func(*test_input)
-                    elif test_input is None:
-                        actual = func()
-                    else:
-                        actual = func(test_input)
+                    # Get the test input and expected output
+                    test_input = test_case.get('input')
+                    expected = test_case.get('expected')
+                    function_name = test_case.get('function')
                     
-                    result['actual'] = actual
+                    # Call the function with test input
+                    if function_name and function_name in namespace and test_case.get('type') == 'complexity':
+                        # Graded on how its runtime scales, not on a value
+                        self._run_complexity_test(namespace[function_name], test_case, result)
+                    elif function_name and function_name in namespace:
+                        func = namespace[function_name]
+                        actual = self._call_function(func, test_input)
                     
-                    # Smart comparison with better error messages
-                    comparison_result = self._compare_values(actual, expected)
-                    result['passed'] = comparison_result['match']
+                        result['actual'] = preview_value(actual)
                     
-                    if not result['passed']:
-                        # Generate helpful error message
-                        result['error'] = self._generate_helpful_error(
-                            expected, actual, function_name, test_case, comparison_result
-                        )
-                else:
-                    result['error'] = self._generate_function_not_found_error(
-                        function_name, user_code, namespace
-                    )
-                
-            finally:
-                # Restore stdout and capture output
-                sys.stdout = old_stdout
-                result['output'] = captured_output.getvalue()
+                        # Smart comparison with better error messages (the
+                        # issue is only worked out when the result is wrong)
+                        comparator = self.comparators.get(expected)
+                        result['passed'] = comparator.matches(actual)
+                    
+                        if not result['passed']:
+                            # Short error now, the full message only on request
+                            result['diagnostic'] = diagnose_mismatch(
+                                comparator.diagnose(actual) or 'value_mismatch',
+                                expected, actual, function_name, test_input
+                            )
+                            result['error'] = summarize(result['diagnostic'])
+                    else:
+                        result['diagnostic'] = diagnose_missing_function(function_name, user_code, namespace)
+                        result['error'] = summarize(result['diagnostic'])
+                    
+                finally:
+                    result['output'] = captured_output.getvalue()
             
         except Exception as e:
             result['error'] = f"{type(e).__name__}: {str(e)}"
@@ -135,6 +600,30 @@ class TestRunner:
         
         return result
     
+    def _call_function(self, func, test_input):
+        """Call a user function, handling the different test input formats"""
+        if isinstance(test_input, dict):
+            return func(**test_input)
+        elif isinstance(test_input, list):
+            return func(*test_input)
+        elif test_input is None:
+            return func()
+        else:
+            return func(test_input)
+    
+    def _run_complexity_test(self, func, test_case: Dict, result: Dict):
+        """Grade how a function's runtime grows with input size"""
+        scaling = measure_scaling(lambda test_input: self._call_function(func, test_input), test_case)
+        
+        result['expected'] = scaling['max_complexity']
+        result['actual'] = scaling['estimated_complexity']
+        result['complexity'] = scaling
+        result['passed'] = scaling['passed']
+        
+        if not result['passed']:
+            result['diagnostic'] = diagnose_complexity(scaling)
+            result['error'] = summarize(result['diagnostic'])
+    
     def validate_code(self, code: str) -> Dict:
         """Validate code without running tests"""
         result = {
@@ -144,294 +633,24 @@ class TestRunner:
         }
         
         try:
-            # Check syntax
-            ast.parse(code)
+            # Check syntax (the analysis is reused if the code is then graded)
+            analysis = self.analyzer.analyze(code)
         except SyntaxError as e:
             result['valid'] = False
             result['errors'].append(f"Syntax Error on line {e.lineno}: {e.msg}")
+            return result
         
-        # Check for common issues
-        if 'import os' in code or 'import sys' in code:
-            result['warnings'].append("System imports detected - be careful!")
+        # Constructs that would stop the code being graded
+        for item in analysis['forbidden']:
+            result['valid'] = False
+            result['errors'].append(f"{item['construct']} is not allowed (line {item['line']})")
         
-        if 'exec' in code or 'eval' in code:
-            result['warnings'].append("Dynamic execution detected - this can be dangerous!")
+        # Check for common issues
+        result['warnings'].extend(analysis['warnings'])
+        result['functions'] = list(analysis['functions'])
         
         return result
     
     def _compare_values(self, actual, expected) -> Dict:
         """Smart comparison that handles different types and edge cases"""
-        result = {'match': False, 'issue': None}
-        
-        # Handle None
-        if actual is None and expected is None:
-            result['match'] = True
-            return result
-        
-        if actual is None or expected is None:
-            result['issue'] = 'none_mismatch'
-            return result
-        
-        # Type mismatch
-        if type(actual) != type(expected):
-            # Allow int/float flexibility
-            if isinstance(actual, (int, float)) and isinstance(expected, (int, float)):
-                result['match'] = abs(actual - expected) < 0.01
-                if not result['match']:
-                    result['issue'] = 'number_mismatch'
-                return result
-            else:
-                result['issue'] = 'type_mismatch'
-                return result
-        
-        # String comparison (strip whitespace)
-        if isinstance(expected, str):
-            if actual.strip() == expected.strip():
-                result['match'] = True
-                return result
-            elif actual == expected:
-                result['match'] = True
-                return result
-            else:
-                result['issue'] = 'string_mismatch'
-                return result
-        
-        # Float comparison (handle precision)
-        if isinstance(expected, float):
-            if abs(actual - expected) < 0.01:
-                result['match'] = True
-                return result
-            else:
-                result['issue'] = 'float_precision'
-                return result
-        
-        # List/Tuple comparison
-        if isinstance(expected, (list, tuple)):
-            if len(actual) != len(expected):
-                result['issue'] = 'length_mismatch'
-                return result
-            
-            # Element-by-element comparison
-            for i, (a, e) in enumerate(zip(actual, expected)):
-                sub_result = self._compare_values(a, e)
-                if not sub_result['match']:
-                    result['issue'] = f'element_{i}_mismatch'
-                    return result
-            
-            result['match'] = True
-            return result
-        
-        # Dict comparison
-        if isinstance(expected, dict):
-            if set(actual.keys()) != set(expected.keys()):
-                result['issue'] = 'dict_keys_mismatch'
-                return result
-            
-            for key in expected:
-                sub_result = self._compare_values(actual.get(key), expected.get(key))
-                if not sub_result['match']:
-                    result['issue'] = f'dict_value_{key}_mismatch'
-                    return result
-            
-            result['match'] = True
-            return result
-        
-        # Default comparison
-        if actual == expected:
-            result['match'] = True
-        else:
-            result['issue'] = 'value_mismatch'
-        
-        return result
-    
-    def _generate_helpful_error(self, expected, actual, function_name, test_case, comparison_result) -> str:
-        """Generate educational error message with debugging help"""
-        issue = comparison_result.get('issue', 'unknown')
-        
-        # Build helpful message based on issue type
-        if issue == 'type_mismatch':
-            return f"""❌ Wrong Data Type
-
-Expected: {type(expected).__name__} ({expected})
-Got: {type(actual).__name__} ({actual})
-
-💡 How to fix:
-- If you need a number, remove quotes: 5 not "5"
-- If you need text, add quotes: "hello" not hello
-- Check your return statement returns the right type
-- Example: return 5 (number) vs return "5" (string)
-"""
-        
-        elif issue == 'string_mismatch':
-            # Show character-by-character difference
-            diff_hint = ""
-            if len(str(actual)) != len(str(expected)):
-                diff_hint = f"\n- Length: Expected {len(str(expected))}, got {len(str(actual))}"
-            
-            return f"""❌ String Doesn't Match
-
-Expected: "{expected}"
-Got: "{actual}"{diff_hint}
-
-💡 How to fix:
-- Check spelling and capitalization carefully
-- Make sure punctuation matches exactly  
-- Remove any extra spaces at start/end
-- Use f-strings for variables: f"Hello, {{name}}!"
-- Check quotes match: "text" or 'text' (be consistent)
-"""
-        
-        elif issue == 'number_mismatch' or issue == 'float_precision':
-            diff = abs(actual - expected) if isinstance(actual, (int, float)) and isinstance(expected, (int, float)) else 'N/A'
-            return f"""❌ Number Doesn't Match
-
-Expected: {expected}
-Got: {actual}
-Difference: {diff}
-
-💡 How to fix:
-- Check your math formula carefully
-- Common mistakes: 
-  * Using + instead of *
-  * Forgetting parentheses: (a + b) * 2
-  * Integer division: use / not //
-- For rounding: round(result, 2) for 2 decimals
-- Print intermediate values to debug: print(f"Result is: {{result}}")
-"""
-        
-        elif issue == 'length_mismatch':
-            return f"""❌ List/Collection Has Wrong Number of Items
-
-Expected {len(expected)} items: {expected}
-Got {len(actual)} items: {actual}
-
-💡 How to fix:
-- Check your loop - are you adding all items?
-- Did you accidentally skip some? Check your 'if' conditions
-- Are you adding extra items by mistake?
-- Use print(my_list) before returning to see what you have
-"""
-        
-        elif issue == 'dict_keys_mismatch':
-            expected_keys = set(expected.keys())
-            actual_keys = set(actual.keys())
-            missing = expected_keys - actual_keys
-            extra = actual_keys - expected_keys
-            
-            msg = "❌ Dictionary Keys Don't Match\n\n"
-            if missing:
-                msg += f"Missing keys: {list(missing)}\n"
-            if extra:
-                msg += f"Extra keys: {list(extra)}\n"
-            msg += f"\n💡 How to fix:\n"
-            msg += f"- Check key names for typos\n"
-            msg += f"- Make sure you're creating all required keys\n"
-            msg += f"- Should have exactly: {list(expected.keys())}\n"
-            msg += f"- Example: {{'key': 'value', 'key2': 'value2'}}\n"
-            
-            return msg
-        
-        elif issue == 'none_mismatch':
-            if actual is None:
-                return """❌ Function Returned Nothing (None)
-
-💡 How to fix:
-- Add a return statement: return result
-- Make sure return is not just 'pass'
-- Check indentation - return should be INSIDE the function
-- Don't just print, you must RETURN:
-  
-  ❌ Wrong:
-  def add(a, b):
-      print(a + b)  # This prints but doesn't return!
-  
-  ✅ Right:
-  def add(a, b):
-      return a + b  # This returns the value
-"""
-            else:
-                return f"""❌ Function Returned Something Unexpected
-
-Expected: None (nothing)
-Got: {actual}
-
-💡 This test expects the function to NOT return anything
-- Remove the return statement, or
-- Check if you're in the right test case
-"""
-        
-        else:
-            # Generic helpful error with debugging steps
-            return f"""❌ Output Doesn't Match
-
-Expected: {expected}
-Got: {actual}
-
-💡 Debugging steps:
-1. **Add print statements** to see what's happening:
-   print(f"My result is: {{result}}")
-   
-2. **Check the instructions** - did you miss a requirement?
-
-3. **Compare to hints** - are you using the right approach?
-
-4. **Test manually** - try calling your function:
-   print({function_name}({test_case.get('input')}))
-   
-5. **Check for typos** in variable names and operations
-
-6. **Verify your logic** - step through mentally line by line
-"""
-    
-    def _generate_function_not_found_error(self, function_name, user_code, namespace) -> str:
-        """Generate helpful error when function is not found"""
-        # Check what functions ARE defined
-        defined_functions = [name for name in namespace if callable(namespace.get(name)) and not name.startswith('_')]
-        
-        has_def = 'def ' in user_code
-        has_function_name = function_name in user_code
-        
-        msg = f"""❌ Function '{function_name}' Not Found
-
-"""
-        
-        if not has_def:
-            msg += """💡 You haven't defined any function yet!
-
-How to define a function:
-```python
-def function_name():
-    # Your code here
-    return result
-```
-
-Steps:
-1. Start with 'def' keyword
-2. Add function name
-3. Add parentheses ()
-4. Add colon :
-5. Indent the code inside (4 spaces or Tab)
-"""
-        elif not has_function_name:
-            msg += f"""💡 Function name doesn't match!
-
-You wrote: {defined_functions if defined_functions else 'no functions'}
-Should be: {function_name}
-
-Check for:
-- Typos in the name
-- Capitalization (Python is case-sensitive!)
-- Extra/missing characters
-"""
-        else:
-            msg += f"""💡 Function exists but isn't callable
-
-Possible issues:
-1. **Indentation error** - 'def' should start at column 0
-2. **Syntax error** - check for missing colons ':'
-3. **Not in the right scope** - function defined inside another function?
-
-Your code has {len(user_code.split('def'))-1} 'def' keyword(s)
-"""
-        
-        return msg
+        return self.comparators.get(expected).compare(actual)
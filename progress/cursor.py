@@ -0,0 +1,46 @@
+"""
+Completion Cursor
+Finds the next uncompleted challenge without rescanning the curriculum
+"""
+
+import threading
+from typing import Iterable, Optional, Sequence
+
+
+class CompletionCursor:
+    """
+    The first uncompleted challenge in curriculum order, kept up to date
+
+    Completions are only ever added, so the cursor only moves forward: each
+    challenge is stepped over at most once, and finding the next one is
+    amortized O(1) however large the curriculum. A different order (after
+    the curriculum is reloaded) starts the scan over once.
+    """
+
+    def __init__(self, completed_ids: Iterable[str] = ()):
+        self._completed = set(completed_ids)
+        self._order = None
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def mark_completed(self, challenge_id: str):
+        """Record a completion (the cursor steps past it on the next lookup)"""
+        with self._lock:
+            self._completed.add(challenge_id)
+
+    def is_completed(self, challenge_id: str) -> bool:
+        return challenge_id in self._completed
+
+    def next_id(self, order: Sequence[str]) -> Optional[str]:
+        """First ID in `order` that isn't completed, None if all of them are"""
+        with self._lock:
+            if order is not self._order:
+                self._order = order
+                self._position = 0
+
+            while self._position < len(order) and order[self._position] in self._completed:
+                self._position += 1
+
+            if self._position < len(order):
+                return order[self._position]
+            return None
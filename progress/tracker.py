@@ -4,9 +4,10 @@ Tracks user learning progress, streaks, and statistics
 """
 
 import json
+import threading
 from pathlib import Path
 from datetime import datetime, timedelta
-from typing import Dict, List, Optional
+from typing import Callable, Dict, List, Optional
 from collections import defaultdict
 
 
@@ -16,6 +17,14 @@ class ProgressTracker:
     def __init__(self, data_file: str = 'user_progress.json'):
         self.data_file = Path(data_file)
         self.data = self._load_data()
+        
+        # Set alongside the saved list, for constant-time membership checks
+        self._completed = set(self.data['completed_challenges'])
+        self._completion_listeners = []
+        self._change_listeners = []
+        
+        # Completions are recorded from request and grading threads
+        self._lock = threading.Lock()
     
     def _load_data(self) -> Dict:
         """Load progress data from file"""
@@ -26,7 +35,29 @@ class ProgressTracker:
             except:
                 return self._create_new_data()
         else:
-            return self._create_new_data()
+            return self._start_new_data()
+    
+    def _start_new_data(self) -> Dict:
+        """
+        Create progress data and save it right away
+        
+        The start date decides which challenge is "today's", so it must be
+        the same for every process (web workers, the reminder scheduler).
+        If another process saved first, its data is used instead.
+        """
+        data = self._create_new_data()
+        try:
+            with open(self.data_file, 'x') as f:
+                json.dump(data, f, indent=2)
+        except FileExistsError:
+            try:
+                with open(self.data_file, 'r') as f:
+                    return json.load(f)
+            except:
+                return data
+        except OSError as e:
+            print(f"Error saving new progress data: {e}")
+        return data
     
     def _create_new_data(self) -> Dict:
         """Create new progress data structure"""
@@ -43,38 +74,73 @@ class ProgressTracker:
     
     def _save_data(self):
         """Save progress data to file"""
+        with self._lock:
+            self._write_data()
+        self._notify_change()
+    
+    def _write_data(self):
+        """Write progress data to file (caller holds the lock)"""
         with open(self.data_file, 'w') as f:
             json.dump(self.data, f, indent=2)
     
+    def _notify_change(self):
+        for callback in self._change_listeners:
+            try:
+                callback(self)
+            except Exception as e:
+                print(f"Error in progress change listener: {e}")
+    
+    def add_change_listener(self, callback: Callable[['ProgressTracker'], None]):
+        """Call `callback(tracker)` whenever the progress data is saved"""
+        self._change_listeners.append(callback)
+    
+    def get_start_date(self) -> datetime:
+        """When the learner started the curriculum"""
+        return datetime.fromisoformat(self.data['start_date'])
+    
     def record_completion(self, challenge_id: str, code: str, time_spent: int):
         """Record a completed challenge"""
         today = datetime.now().date().isoformat()
         
-        # Check if already completed
-        if challenge_id in self.data['completed_challenges']:
-            return
-        
-        # Add to completed list
-        self.data['completed_challenges'].append(challenge_id)
-        
-        # Update time
-        self.data['total_time_minutes'] += time_spent
-        
-        # Update streak
-        self._update_streak(today)
-        
-        # Record in daily history
-        self.data['daily_history'].append({
-            'date': today,
-            'challenge_id': challenge_id,
-            'time_spent': time_spent,
-            'timestamp': datetime.now().isoformat()
-        })
-        
-        # Update last activity
-        self.data['last_activity_date'] = today
+        with self._lock:
+            # Check if already completed
+            if challenge_id in self._completed:
+                return
+            
+            # Add to completed list
+            self.data['completed_challenges'].append(challenge_id)
+            self._completed.add(challenge_id)
+            
+            # Update time
+            self.data['total_time_minutes'] += time_spent
+            
+            # Update streak
+            self._update_streak(today)
+            
+            # Record in daily history
+            self.data['daily_history'].append({
+                'date': today,
+                'challenge_id': challenge_id,
+                'time_spent': time_spent,
+                'timestamp': datetime.now().isoformat()
+            })
+            
+            # Update last activity
+            self.data['last_activity_date'] = today
+            
+            self._write_data()
         
-        self._save_data()
+        # Listeners run outside the lock, so they can read the tracker
+        self._notify_change()
+        for callback in self._completion_listeners:
+            try:
+                callback(challenge_id)
+            except Exception as e:
+                print(f"Error in completion listener: {e}")
+    
+    def add_completion_listener(self, callback: Callable[[str], None]):
+        """Call `callback(challenge_id)` whenever a new completion is recorded"""
+        self._completion_listeners.append(callback)
     
     def _update_streak(self, today: str):
         """Update learning streak"""
@@ -144,7 +210,7 @@ class ProgressTracker:
     
     def is_completed(self, challenge_id: str) -> bool:
         """Check if a challenge has been completed"""
-        return challenge_id in self.data['completed_challenges']
+        return challenge_id in self._completed
     
     def get_completed_ids(self) -> List[str]:
         """Get list of all completed challenge IDs"""
@@ -67,7 +67,7 @@ class ReminderScheduler:
         from challenges.loader import ChallengeLoader
         
         tracker = ProgressTracker()
-        loader = ChallengeLoader()
+        loader = ChallengeLoader(progress=tracker)
         
         stats = tracker.get_stats()
         today_challenge = loader.get_today_challenge()
@@ -261,3 +261,36 @@ style.textContent = `
 document.head.appendChild(style);
 
 console.log('🐍 PyQuest loaded successfully!');
+
+// Failing tests come back with a one-line error and a compact diagnostic;
+// the full explanation is fetched from /api/explain when asked for
+const testDiagnostics = {};
+let nextDiagnosticId = 0;
+
+function explainButton(test) {
+    if (!test.diagnostic) return '';
+    const id = nextDiagnosticId++;
+    testDiagnostics[id] = test.diagnostic;
+    return `<button class="btn btn-small btn-secondary" onclick="explainFailure(this, ${id})">💡 Explain</button>`;
+}
+
+async function explainFailure(button, id) {
+    button.disabled = true;
+    try {
+        const response = await fetch('/api/explain', {
+            method: 'POST',
+            headers: {'Content-Type': 'application/json'},
+            body: JSON.stringify({diagnostic: testDiagnostics[id]})
+        });
+        const data = await response.json();
+        const details = button.parentElement.querySelector('.error-details');
+        if (data.message && details) {
+            details.textContent = data.message;
+            button.remove();
+        } else {
+            button.disabled = false;
+        }
+    } catch (error) {
+        button.disabled = false;
+    }
+}
@@ -0,0 +1,105 @@
+"""
+Output capture under concurrent grading: every submission must get
+exactly its own output, however many are graded at once
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from grader.capture import CappedBuffer, capture_output
+from grader import test_runner
+
+GRADINGS = 300
+
+SUBMISSION = '''
+print("module {n}")
+
+def echo(value):
+    for i in range(20):
+        print("call {n}", i)
+    return value
+'''
+
+TESTS = [
+    {'function': 'echo', 'input': [1], 'expected': 1},
+    {'function': 'echo', 'input': [2], 'expected': 2},
+    {'function': 'echo', 'input': [3], 'expected': 3},
+]
+
+
+def expected_output(n):
+    calls = ''.join(f"call {n} {i}\n" for i in range(20))
+    return f"module {n}\n" + calls
+
+
+def grade_all(runner, mode):
+    # Start every grading at once to maximize interleaving
+    barrier = threading.Barrier(32)
+
+    def grade(n):
+        if n < 32:
+            barrier.wait()
+        return n, runner.run_tests(SUBMISSION.format(n=n), TESTS, mode=mode, include_output=True)
+
+    with ThreadPoolExecutor(max_workers=32) as executor:
+        return list(executor.map(grade, range(GRADINGS)))
+
+
+def check_outputs(gradings):
+    for n, results in gradings:
+        assert results['passed'], results['error']
+        for test_result in results['test_results']:
+            assert test_result['output'] == expected_output(n)
+
+
+def test_concurrent_gradings_never_cross_output():
+    check_outputs(grade_all(test_runner.TestRunner(), mode='sequential'))
+
+
+def test_concurrent_parallel_gradings_never_cross_output():
+    check_outputs(grade_all(test_runner.TestRunner(), mode='parallel'))
+
+
+def test_concurrent_gradings_without_exec_once():
+    check_outputs(grade_all(test_runner.TestRunner(exec_once=False), mode='sequential'))
+
+
+def test_captures_in_threads_are_isolated():
+    barrier = threading.Barrier(GRADINGS)
+    outputs = {}
+
+    def write(n):
+        with capture_output() as buffer:
+            barrier.wait()
+            for i in range(50):
+                print(n, i)
+        outputs[n] = buffer.getvalue()
+
+    threads = [threading.Thread(target=write, args=(n,)) for n in range(GRADINGS)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    for n in range(GRADINGS):
+        assert outputs[n] == ''.join(f"{n} {i}\n" for i in range(50))
+
+
+def test_nested_capture_restores_outer_buffer():
+    with capture_output() as outer:
+        print("before")
+        with capture_output() as inner:
+            print("inside")
+        print("after")
+
+    assert inner.getvalue() == "inside\n"
+    assert outer.getvalue() == "before\nafter\n"
+
+
+def test_capped_buffer_truncates():
+    buffer = CappedBuffer(max_bytes=10)
+    with capture_output(buffer):
+        print("x" * 100)
+
+    assert buffer.truncated
+    assert buffer.getvalue().startswith("x" * 10 + "\n... [output truncated after 10 bytes]")